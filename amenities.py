@@ -0,0 +1,70 @@
+import itertools
+import re
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+CLEAN = re.compile('[^a-zA-Z\d\s]')
+
+# placeholders of the Inside-Airbnb export for amenities without an English name
+MISSING = 'translation missing'
+
+
+def split_amenities(amenities):
+    """
+    Turn the raw '{TV,"Cable TV",...}' strings into lists of amenity names without special characters
+    """
+    return [[CLEAN.sub('', it) for it in raw.split(',')] for raw in amenities]
+
+
+def encode_amenities(amenities, vocabulary):
+    """
+    Multi-hot encode lists of amenity names into a sparse (listings x vocabulary) CSR matrix,
+    names outside the vocabulary are ignored
+    """
+    amenities = list(amenities)
+    lengths = np.fromiter((len(items) for items in amenities), dtype=np.int64, count=len(amenities))
+    names = list(itertools.chain.from_iterable(amenities))
+
+    codes = pd.Categorical(names, categories=vocabulary).codes
+    return multi_hot(lengths, codes, len(vocabulary))
+
+
+def encode_raw_amenities(amenities, vocabulary):
+    """
+    Same as encode_amenities(split_amenities(amenities), vocabulary) for the raw comma separated
+    strings, but every distinct name is cleaned only once. Names are also stripped, so
+    hand-written lists like "TV, Wifi" match the vocabulary.
+    """
+    names = pd.Series(amenities, dtype=object).fillna('').str.split(',')
+    lengths = names.str.len().to_numpy()
+
+    codes, distinct = pd.factorize(names.explode().to_numpy())
+    cleaned = [CLEAN.sub('', name).strip() for name in distinct]
+    return multi_hot(lengths, pd.Categorical(cleaned, categories=vocabulary).codes[codes], len(vocabulary))
+
+
+def multi_hot(lengths, codes, width):
+    """
+    CSR matrix with a one in every row for each of its vocabulary codes, rows take lengths[i]
+    consecutive codes and negative codes are skipped
+    """
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    keep = codes >= 0
+
+    matrix = sp.csr_matrix((np.ones(keep.sum(), dtype=np.uint8), (rows[keep], codes[keep])),
+                           shape=(len(lengths), width))
+    # an amenity listed twice is still a single feature
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+def fit_vocabulary(amenities, min_count):
+    """
+    Sorted names of the amenities offered by at least min_count listings
+    """
+    amenities = list(amenities)
+    names = sorted({name for items in amenities for name in items if name and not name.startswith(MISSING)})
+    counts = np.asarray(encode_amenities(amenities, names).sum(axis=0)).ravel()
+    return [name for name, count in zip(names, counts) if count >= min_count]
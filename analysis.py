@@ -1,33 +1,22 @@
-import base64
 import streamlit as st
 import plotly.express as px
 import folium
-from streamlit_folium import folium_static
-from folium import IFrame
-from folium.plugins import MarkerCluster
-import numpy as np
-
-
-png = ["sites/statue_of_liberty.PNG",
-           "sites/central_park.PNG",
-           "sites/Top_of_the_Rock.PNG",
-           "sites/Rockefeller_Center.PNG",
-           "sites/Metropolitan_measum.PNG",
-           "sites/Broadway.PNG",
-           "sites/empire_state.PNG",
-           "sites/9-11.PNG",
-           "sites/high_line.PNG",
-           "sites/times_squars.PNG",
-           "sites/brooklin_bridge.PNG",
-           "sites/fifth_avenue.PNG",
-           "sites/central_terminal.PNG",
-           "sites/one_world_obd.PNG",
-           "sites/the_frick.PNG",
-           "sites/library.PNG"]
-
-
-def app(df_listings, df_attractions):
-    neighs = df_listings['neighbourhood'].unique()
+import pandas as pd
+from attraction_layer import add_attractions
+from map_layers import add_listing_markers, render_map
+from instrumentation import annotate, measure
+
+
+PRICE_BIN = 50
+RATING_BIN = 5
+
+# artifacts passed to app, with the columns read from them
+ARTIFACTS = {'listing_store': ['neighbourhood', 'latitude', 'longitude', 'price', 'review_scores_rating'],
+             'df_attractions': None}
+
+
+def app(city, listing_store, df_attractions):
+    neighs = listing_store.neighbourhoods
 
     st.subheader("Prices and Ratings distributions")
     st.markdown(
@@ -35,9 +24,6 @@ def app(df_listings, df_attractions):
         "In addition a distribution of prices and user's ratings are shown by the two figures above according to our selections. "
         "In that way we can compare the values of prices between different neighbourhoods and choose the one which is more suitable to our budget ")
 
-    ###################### round prices #############################
-    df_listings = df_listings.assign(round_price=np.ceil(df_listings['price'] / 50.0) * 50)
-
     ################################ streamlit ######################################################
     rprt_status = st.sidebar.selectbox("Choose Neighbourhood(*)", neighs)
     minimum = st.sidebar.number_input("Minimum Price (Starting from: 5$)", min_value=5, max_value=10000, value=300, step=50)
@@ -45,17 +31,24 @@ def app(df_listings, df_attractions):
     if minimum > maximum:
         st.error("Please enter a valid range")
     st.sidebar.write("(*) The neighbourhoods are sorted based on their distance from the tourist attractions")
+    annotate(neighbourhood=rprt_status, minimum=minimum, maximum=maximum)
 
     col1, col2 = st.beta_columns([2, 2])
-    filtered_data = df_listings[
-        (df_listings['neighbourhood'] == rprt_status) & (df_listings['round_price'] >= minimum) & (
-                df_listings['round_price'] <= maximum)].copy()
-    fig1 = px.histogram(filtered_data, x='round_price', width=800, height=350)
+    # only the bar heights are computed and sent, repeated selections come from the store's cache
+    with measure('step', 'analysis.histograms'):
+        price_edges, price_counts = listing_store.histogram(rprt_status, minimum, maximum, 'price', PRICE_BIN)
+        rating_edges, rating_counts = listing_store.histogram(rprt_status, minimum, maximum, 'review_scores_rating', RATING_BIN)
+    price_hist = pd.DataFrame({'round_price': price_edges.astype(int).astype(str), rprt_status: price_counts})
+    rating_hist = pd.DataFrame({'review_scores_rating': rating_edges.astype(int).astype(str), rprt_status: rating_counts})
+
+    fig1 = px.bar(price_hist, x='round_price', y=rprt_status, width=800, height=350,
+                  labels={rprt_status: 'count'})
     fig1.update_traces(marker_color='#428DB2', marker_line_color='#428DB2',
                       marker_line_width=1.5, opacity=0.8)
     col1.plotly_chart(fig1)
 
-    fig2 = px.histogram(filtered_data, x='review_scores_rating', width=800, height=350)
+    fig2 = px.bar(rating_hist, x='review_scores_rating', y=rprt_status, width=800, height=350,
+                  labels={rprt_status: 'count'})
     fig2.update_traces(marker_color='#428DB2', marker_line_color='#428DB2',
                        marker_line_width=1.5, opacity=0.8)
     col2.plotly_chart(fig2)
@@ -70,31 +63,14 @@ def app(df_listings, df_attractions):
         "with those regions of the city with the most interesting places to visit. Finally by clicking the attraction's marker a picture of it shows up "
         "which is a good indication for a new visitor of the city.")
 
-    popup = []
-
-    for i in range(len(png)):
-        encoded = base64.b64encode(open(png[i], 'rb').read()).decode()
-        building_name = df_attractions.Attraction[i]
-        html = building_name
-        html += '<img src="data:image/png[i];base64,{}" width="100" height="100">'.format(encoded)
-        iframe = IFrame(html, width=130, height=150)
-        popup.append(folium.Popup(iframe, max_width=130))
-
-    map_hooray = folium.Map([40.730610, -73.935242], zoom_start=11, tiles="OpenStreetMap")
-
-    for i in range(len(png)):
-        folium.Marker([df_attractions.latitude[i], df_attractions.longitude[i]], popup=popup[i],
-                      icon=folium.Icon(color='blue', icon_color='white', icon='globe')).add_to(map_hooray)
-
-    # add a marker for every record in the filtered data, use a clustered view
-    marker_cluster = MarkerCluster().add_to(map_hooray)  # create marker clusters
-    for index, row in filtered_data.iterrows():
-        html = "Price: " + str(row.price) + "$" + "<br>" + "Rating: " + str(row.review_scores_rating)
-
-        iframe = folium.IFrame(html, width=130, height=60)
+    map_hooray = folium.Map(city['center'], zoom_start=11, tiles="OpenStreetMap")
 
-        new_pops = folium.Popup(iframe, max_width=130)
+    add_attractions(map_hooray, df_attractions, city['sites'])
 
-        folium.Marker([row.latitude, row.longitude], radius=5, popup=new_pops, ).add_to(marker_cluster)
+    # add every record in the filtered data to a clustered view built in the browser,
+    # only the selected listings are copied out of the shared store
+    filtered_data = listing_store.frame(listing_store.select(rprt_status, minimum, maximum), ARTIFACTS['listing_store'])
+    with measure('step', 'analysis.markers'):
+        add_listing_markers(map_hooray, filtered_data, [('Price', 'price', '$'), ('Rating', 'review_scores_rating', '')])
 
-    folium_static(map_hooray, width=1000, height=600)
\ No newline at end of file
+    render_map(map_hooray, width=1000, height=600)
\ No newline at end of file
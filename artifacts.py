@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import re
+import joblib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ARTIFACTS_DIR = 'artifacts'
+
+# dtypes enforced when an artifact is written and checked again when it is read back,
+# parquet keeps them so loading does no parsing or dtype inference. Metrics and coordinates
+# are float32, rounded bins and counts the smallest int that holds them. Column names are
+# matched as regular expressions, e.g. the distance to every attraction of the city.
+LISTINGS_SCHEMA = {
+    'neighbourhood': 'category',
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'price': 'float32',
+    'review_scores_rating': 'float32',
+    'host_response_rate': 'float32',
+    'reviews_per_month': 'float32',
+    'zipcode': 'category',
+    'distance': 'float32',
+    r'distance_\d+': 'float32',
+    'nearest_attraction': 'category',
+    'nearest_distance': 'float32',
+    'round_price': 'int32',
+    'round_rating': 'int16',
+    'count_amenities': 'int16',
+    'round_amenities': 'int16',
+}
+
+# columns of the listings kept for clustering, the investment page reads nothing else
+CLUST_SCHEMA = {
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'price': 'float32',
+    'zipcode': 'int32',
+    'distance': 'float32',
+}
+
+# artifacts that are not DataFrames, everything else is stored as parquet
+FORMATS = {
+    'price_model': 'joblib',
+    'cluster_shapes': 'json',
+    'statistics_figures': 'json',
+}
+
+SCHEMAS = {
+    'df_listings': LISTINGS_SCHEMA,
+    'df_clust': CLUST_SCHEMA,
+}
+
+# artifacts stored in the order their chunks were built in and sorted by this column when they are
+# loaded, so that building them never holds all the chunks in memory. The pages rely on the order.
+ORDERS = {
+    'df_listings': 'distance',
+}
+
+
+def artifact_path(name, directory=ARTIFACTS_DIR):
+    return os.path.join(directory, name + '.' + FORMATS.get(name, 'parquet'))
+
+
+def apply_schema(df, name):
+    """
+    Cast the columns of df to the dtypes declared for the artifact
+    """
+    schema = SCHEMAS.get(name, {})
+    dtypes = {}
+    for column in df.columns:
+        dtype = schema_dtype(schema, column)
+        if dtype is not None and str(df[column].dtype) != dtype:
+            dtypes[column] = dtype
+    neighbourhoods = None
+    if 'neighbourhood' in df.columns and schema_dtype(schema, 'neighbourhood') == 'category':
+        # keep the categories in order of appearance, the pages rely on it (listings are sorted by distance)
+        categories = list(df['neighbourhood'].dropna().unique())
+        if 'neighbourhood' in dtypes:
+            dtypes['neighbourhood'] = pd.CategoricalDtype(categories)
+        elif list(df['neighbourhood'].cat.categories) != categories:
+            # rows loaded in their ORDERS keep the categories of the chunks they were written in, astype would
+            # keep them too as unordered categories compare equal in any order
+            neighbourhoods = df['neighbourhood'].cat.set_categories(categories)
+    if dtypes:
+        df = df.astype(dtypes)
+    if neighbourhoods is not None:
+        df = df.assign(neighbourhood=neighbourhoods)
+    return df
+
+
+def schema_dtype(schema, column):
+    """
+    dtype the schema declares for the column, None if it declares none
+    """
+    if column in schema:
+        return schema[column]
+    for pattern, dtype in schema.items():
+        if re.fullmatch(pattern, str(column)):
+            return dtype
+    return None
+
+
+def save_artifact(df, name, directory=ARTIFACTS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    if FORMATS.get(name) == 'joblib':
+        joblib.dump(df, artifact_path(name, directory))
+        return
+    if FORMATS.get(name) == 'json':
+        with open(artifact_path(name, directory), 'w') as f:
+            json.dump(df, f)
+        return
+    apply_schema(df, name).to_parquet(artifact_path(name, directory), engine='pyarrow', index=True)
+
+
+def load_artifact(name, directory=ARTIFACTS_DIR, columns=None):
+    if FORMATS.get(name) == 'joblib':
+        return joblib.load(artifact_path(name, directory))
+    if FORMATS.get(name) == 'json':
+        with open(artifact_path(name, directory)) as f:
+            return json.load(f)
+    order = ORDERS.get(name)
+    read = columns if columns is None or order is None or order in columns else list(columns) + [order]
+    df = pd.read_parquet(artifact_path(name, directory), engine='pyarrow', columns=read)
+    if order is not None:
+        df = df.sort_values(order, kind='mergesort')
+        if read is not columns:
+            df = df.drop(columns=order)
+    return apply_schema(df, name)
+
+
+def save_chunks(chunks, name, directory=ARTIFACTS_DIR):
+    """
+    Write an iterable of DataFrames to one artifact, holding a single chunk in memory at a time
+    """
+    os.makedirs(directory, exist_ok=True)
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(apply_schema(chunk, name), preserve_index=True,
+                                         schema=writer.schema if writer else None)
+            if writer is None:
+                # a column that is empty in the first chunk would be typed as null, store it as strings
+                schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                                    for f in table.schema], metadata=table.schema.metadata)
+                table = table.cast(schema)
+                writer = pq.ParquetWriter(artifact_path(name, directory), schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def iter_artifact(name, directory=ARTIFACTS_DIR, chunksize=None):
+    """
+    Read an artifact back in chunks of chunksize rows, or as one chunk when chunksize is None
+    """
+    if chunksize is None:
+        yield load_artifact(name, directory)
+        return
+    parquet_file = pq.ParquetFile(artifact_path(name, directory))
+    for batch in parquet_file.iter_batches(batch_size=chunksize):
+        yield apply_schema(pa.Table.from_batches([batch], schema=parquet_file.schema_arrow).to_pandas(), name)
+
+
+def default_dtypes(df):
+    """
+    df with the dtypes pandas gives the columns when they are built or read from CSV: objects
+    instead of categories, 64 bit numbers
+    """
+    dtypes = {}
+    for column, dtype in df.dtypes.items():
+        if str(dtype) == 'category':
+            dtypes[column] = object
+        elif dtype.kind == 'f':
+            dtypes[column] = 'float64'
+        elif dtype.kind in 'iu':
+            dtypes[column] = 'int64'
+    return df.astype(dtypes)
+
+
+def memory_report(df, name):
+    """
+    dtype and memory in bytes of every column of df with the default dtypes and with the schema of
+    the artifact, with a total row
+    """
+    before = default_dtypes(df)
+    after = apply_schema(before, name)
+    report = pd.DataFrame({'dtype_before': before.dtypes.astype(str),
+                           'bytes_before': before.memory_usage(index=False, deep=True),
+                           'dtype_after': after.dtypes.astype(str),
+                           'bytes_after': after.memory_usage(index=False, deep=True)})
+    report.loc['total'] = ['', report['bytes_before'].sum(), '', report['bytes_after'].sum()]
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the memory used by the columns of artifacts with the default "
+                                                 "pandas dtypes and with their compact schema")
+    parser.add_argument('names', nargs='+', help="artifacts to report on, e.g. df_listings df_clust")
+    parser.add_argument('--city', default=None, help="city whose artifacts are reported, the default city if not given")
+    args = parser.parse_args(argv)
+
+    from cities import DEFAULT_CITY, city_directory
+    directory = city_directory(args.city or DEFAULT_CITY)
+
+    for name in args.names:
+        report = memory_report(load_artifact(name, directory), name)
+        total = report.loc['total']
+        print("{}: {:,.1f} MB -> {:,.1f} MB".format(name, total['bytes_before'] / 2 ** 20, total['bytes_after'] / 2 ** 20))
+        print(report.to_string())
+        print()
+
+
+if __name__ == '__main__':
+    main()
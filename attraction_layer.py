@@ -0,0 +1,73 @@
+import base64
+import io
+import json
+from functools import lru_cache
+from branca.element import MacroElement, Template
+from PIL import Image
+
+THUMBNAIL_SIZE = (100, 100)
+
+
+@lru_cache(maxsize=None)
+def thumbnail(path):
+    """
+    base64 JPEG of the picture resized to the size it is shown at, encoded once per process
+    """
+    with Image.open(path) as image:
+        small = image.convert('RGB').resize(THUMBNAIL_SIZE, Image.LANCZOS)
+    buffer = io.BytesIO()
+    small.save(buffer, format='JPEG', quality=85, optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+@lru_cache(maxsize=None)
+def popup_html(name, path):
+    html = name + '<br>'
+    html += '<img src="data:image/jpeg;base64,{}" width="{}" height="{}">'.format(thumbnail(path), *THUMBNAIL_SIZE)
+    return html
+
+
+@lru_cache(maxsize=None)
+def attraction_script(attractions):
+    """
+    JS function adding a globe marker with a picture popup for every (name, latitude, longitude, picture path)
+    of attractions to the map it is called with, rendered once per city and process
+    """
+    data = [[latitude, longitude, popup_html(name, path)] for name, latitude, longitude, path in attractions]
+    # the popup html is used as is, an IFrame would base64 encode the picture a second time on every render
+    return ("function (map) {"
+            "var data = " + json.dumps(data) + ";"
+            "var icon = L.AwesomeMarkers.icon({markerColor: 'blue', iconColor: 'white', icon: 'globe', "
+            "prefix: 'glyphicon'});"
+            "var layer = L.featureGroup();"
+            "for (var i = 0; i < data.length; i++) {"
+            "L.marker([data[i][0], data[i][1]], {icon: icon}).bindPopup(data[i][2], {maxWidth: 130}).addTo(layer);"
+            "}"
+            "return layer.addTo(map);}")
+
+
+class AttractionLayer(MacroElement):
+    """
+    The markers of attraction_script, only the call on the map it is added to is rendered per map
+    """
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = ({{ this.script }})({{ this._parent.get_name() }});
+        {% endmacro %}
+        """)
+
+    def __init__(self, attractions):
+        super(AttractionLayer, self).__init__()
+        self._name = 'AttractionLayer'
+        self.script = attraction_script(attractions)
+
+
+def add_attractions(map_hooray, df_attractions, sites):
+    """
+    Add a marker with a picture popup for every attraction to the map, sites are the paths of the
+    pictures in the order of df_attractions
+    """
+    attractions = tuple(zip(df_attractions.Attraction[:len(sites)], df_attractions.latitude[:len(sites)].astype(float),
+                            df_attractions.longitude[:len(sites)].astype(float), sites))
+    AttractionLayer(attractions).add_to(map_hooray)
+    return map_hooray
@@ -0,0 +1,147 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from amenities import encode_raw_amenities
+from artifacts import load_artifact
+from cities import CITIES, DEFAULT_CITY, city_directory
+from geo import distance_to_center, locate
+from model import predict_price
+
+# seconds between two requests to the Nominatim geocoder
+NOMINATIM_DELAY = 1.0
+
+
+def load_scoring_artifacts(directory=city_directory(DEFAULT_CITY)):
+    return {
+        'price_model': load_artifact('price_model', directory),
+        'facilities': load_artifact('facilities', directory)['facility'].tolist(),
+        'gazetteer': load_artifact('gazetteer', directory),
+        'df_attractions': load_artifact('df_attractions', directory),
+    }
+
+
+def candidate_coordinates(candidates, gazetteer, geocoder=None, region=CITIES[DEFAULT_CITY]['region'], geocoded=None):
+    """
+    latitude/longitude of every candidate, taken from its own columns when present and from the
+    centroid of its neighbourhood otherwise. geocoded maps the names already sent to the geocoder to
+    their (latitude, longitude), None for the ones it failed on; it is filled in so that the next
+    chunks do not ask again.
+    """
+    lat = np.array(candidates['latitude'], dtype=float) if 'latitude' in candidates else np.full(len(candidates), np.nan)
+    lon = np.array(candidates['longitude'], dtype=float) if 'longitude' in candidates else np.full(len(candidates), np.nan)
+    if 'neighbourhood' not in candidates:
+        return lat, lon
+
+    missing = np.isnan(lat) | np.isnan(lon)
+    centroids = gazetteer[['latitude', 'longitude']].reindex(candidates['neighbourhood'].to_numpy())
+    if geocoder is not None:
+        from geopy.exc import GeopyError
+        geocoded = geocoded if geocoded is not None else {}
+        unknown = centroids.index[missing & centroids['latitude'].isna().to_numpy()].dropna().unique()
+        for name in unknown:
+            if name not in geocoded:
+                # a name the geocoder does not know or cannot answer for leaves its candidates without a price
+                try:
+                    geocoded[name] = locate(gazetteer, name, geocoder, region)
+                except (KeyError, GeopyError):
+                    geocoded[name] = None
+            if geocoded[name] is not None:
+                centroids.loc[name] = geocoded[name]
+    lat[missing] = centroids['latitude'].to_numpy()[missing]
+    lon[missing] = centroids['longitude'].to_numpy()[missing]
+    return lat, lon
+
+
+def build_features(candidates, price_model, facilities, gazetteer, df_attractions, geocoder=None,
+                   region=CITIES[DEFAULT_CITY]['region'], geocoded=None):
+    """
+    Feature matrix in the layout of df_predictions for a frame of candidate listings with
+    neighbourhood, amenities (comma separated) and/or latitude/longitude columns
+    """
+    features = price_model['features']
+    position = {name: i for i, name in enumerate(features)}
+    X = np.zeros((len(candidates), len(features)), dtype=np.float32)
+
+    if 'amenities' in candidates:
+        X[:, [position[name] for name in facilities]] = encode_raw_amenities(candidates['amenities'],
+                                                                             facilities).toarray()
+
+    if 'neighbourhood' in candidates:
+        # every column that is neither an amenity nor the distance is a neighbourhood dummy
+        amenity_columns = set(facilities)
+        neighbourhoods = [name for name in features if name not in amenity_columns and name != 'distance']
+        columns = np.array([position[name] for name in neighbourhoods])
+        codes = pd.Categorical(candidates['neighbourhood'], categories=neighbourhoods).codes
+        known = codes >= 0
+        X[np.flatnonzero(known), columns[codes[known]]] = 1
+
+    lat, lon = candidate_coordinates(candidates, gazetteer, geocoder, region, geocoded)
+    X[:, position['distance']] = distance_to_center(df_attractions, lat, lon)
+
+    return pd.DataFrame(X, index=candidates.index, columns=features)
+
+
+def score(candidates, price_model, facilities, gazetteer, df_attractions, n_jobs=-1, block_size=50000, geocoder=None,
+          region=CITIES[DEFAULT_CITY]['region'], geocoded=None):
+    """
+    Predicted price of every candidate, NaN for the ones without a known location
+    """
+    X = build_features(candidates, price_model, facilities, gazetteer, df_attractions, geocoder, region, geocoded)
+    located = ~np.isnan(X['distance'].to_numpy())
+    X_located = X[located]
+
+    blocks = [X_located.iloc[start:start + block_size] for start in range(0, len(X_located), block_size)]
+    # tree prediction releases the GIL, threads avoid copying the model to every worker
+    predictions = Parallel(n_jobs=n_jobs, prefer='threads')(delayed(predict_price)(price_model, block)
+                                                            for block in blocks)
+
+    y_pred = np.full(len(candidates), np.nan)
+    if predictions:
+        y_pred[located] = np.concatenate(predictions)
+    return pd.Series(y_pred, index=candidates.index, name='predicted_price')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict the price of many prospective listings from a CSV file "
+                                                 "with neighbourhood, amenities and/or latitude, longitude columns")
+    parser.add_argument('input', help="CSV file of candidate listings")
+    parser.add_argument('output', help="CSV file to write the candidates with their predicted_price to")
+    parser.add_argument('--chunksize', type=int, default=250000, help="rows read and scored at a time")
+    parser.add_argument('--jobs', type=int, default=-1, help="number of threads used for scoring")
+    parser.add_argument('--city', choices=list(CITIES), default=DEFAULT_CITY,
+                        help="city whose price model and neighbourhoods are used")
+    parser.add_argument('--geocode', action='store_true',
+                        help="geocode neighbourhoods missing from the gazetteer online (Nominatim)")
+    args = parser.parse_args(argv)
+
+    geocoder = None
+    if args.geocode:
+        from geopy.extra.rate_limiter import RateLimiter
+        from geopy.geocoders import Nominatim
+        geocoder = Nominatim(user_agent="electra")
+        # Nominatim's usage policy allows one request per second
+        geocoder.geocode = RateLimiter(geocoder.geocode, min_delay_seconds=NOMINATIM_DELAY)
+
+    artifacts = load_scoring_artifacts(city_directory(args.city))
+    # names geocoded by any chunk, successful or not, the geocoder is asked about each one once
+    geocoded = {}
+    start = time.perf_counter()
+    rows = unlocated = 0
+    for i, chunk in enumerate(pd.read_csv(args.input, chunksize=args.chunksize, dtype={'neighbourhood': str,
+                                                                                          'amenities': str})):
+        chunk['predicted_price'] = score(chunk, n_jobs=args.jobs, geocoder=geocoder, region=CITIES[args.city]['region'],
+                                         geocoded=geocoded, **artifacts)
+        chunk.to_csv(args.output, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        rows += len(chunk)
+        unlocated += chunk['predicted_price'].isna().sum()
+
+    seconds = time.perf_counter() - start
+    print("Scored {} listings in {:.1f}s ({:.0f} rows/s)".format(rows, seconds, rows / max(seconds, 1e-9)))
+    if unlocated:
+        print("{} listings have no known location and were left without a price".format(unlocated))
+
+
+if __name__ == '__main__':
+    main()
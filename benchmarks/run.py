@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# widget answers of every benchmarked page view, by widget label. Widgets not listed return their default
+# value, buttons are pressed. A callable answer gets the options of the widget.
+SCENARIOS = {
+    'introduction': ('introduction', {}),
+    'statistics': ('statistics', {}),
+    'analysis': ('analysis', {}),
+    'listing_finder_radius': ('listing_finder', {
+        "Select one or more queries (by order of priority):": ['Lowest price', 'Highest score']}),
+    'listing_finder_neighbourhood': ('listing_finder', {
+        "Choose Radius or Neighbourhood": lambda options: options[1],
+        "Select one or more queries (by order of priority):": ['Highest score', 'Lowest price']}),
+    'prediction': ('prediction', {"Select all": True}),
+    'investment': ('investment', {"Show a sample of the listings": True}),
+}
+
+# functions of the page modules that send the page to the browser, replaced by no-ops
+RENDERERS = ['render_map']
+
+
+class Streamlit:
+    """
+    Stand-in for the streamlit module inside a page: widgets return the answer given for their label
+    or their default value, everything that only displays something does nothing
+    """
+
+    def __init__(self, answers=None):
+        self.answers = answers or {}
+        self.sidebar = self
+
+    def answer(self, label, options, default):
+        value = self.answers.get(label, default)
+        return value(options) if callable(value) else value
+
+    def selectbox(self, label, options, index=0, **kwargs):
+        options = list(options)
+        return self.answer(label, options, options[index])
+
+    radio = selectbox
+
+    def multiselect(self, label, options, default=None, **kwargs):
+        return self.answer(label, list(options), list(default) if default is not None else [])
+
+    def slider(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return self.answer(label, None, min_value if value is None else value)
+
+    number_input = slider
+
+    def select_slider(self, label, options=(), value=None, **kwargs):
+        options = list(options)
+        return self.answer(label, options, options[0] if value is None else value)
+
+    def checkbox(self, label, value=False, **kwargs):
+        return self.answer(label, None, value)
+
+    def button(self, label, **kwargs):
+        return self.answer(label, None, True)
+
+    def beta_columns(self, spec):
+        return [self] * (spec if isinstance(spec, int) else len(spec))
+
+    def beta_container(self):
+        return self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def time_stages(chunksize=None):
+    """
+    Run every build stage of the default city from scratch, seconds per stage
+    """
+    import save_csv  # registers the stages
+    from cities import DEFAULT_CITY
+    from pipeline import build_city
+
+    _, summary = build_city(DEFAULT_CITY, force=True, chunksize=chunksize)
+    return {name: round(seconds, 4) for name, _, seconds in summary}
+
+
+def load_page(module):
+    """
+    Page module of the project by file, the statistics page shares its name with the standard library module
+    """
+    spec = importlib.util.spec_from_file_location('page_' + module, os.path.join(ROOT, module + '.py'))
+    page = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(page)
+    return page
+
+
+def time_page(module, answers, repeat):
+    """
+    Seconds of the first view of the page, which loads its artifacts and fills its caches, and median
+    seconds of the following views
+    """
+    from cities import CITIES, DEFAULT_CITY, city_directory
+    from data import page_data
+
+    page = load_page(module)
+    replaced = {name: getattr(page, name) for name in ['st'] + RENDERERS if hasattr(page, name)}
+    page.st = Streamlit(answers)
+    for name in RENDERERS:
+        if name in replaced:
+            setattr(page, name, lambda *args, **kwargs: None)
+    try:
+        seconds = []
+        for _ in range(repeat + 1):
+            start = time.perf_counter()
+            page.app(CITIES[DEFAULT_CITY], **page_data(page.ARTIFACTS, city_directory(DEFAULT_CITY)))
+            seconds.append(time.perf_counter() - start)
+    finally:
+        for name, value in replaced.items():
+            setattr(page, name, value)
+    return {'cold': round(seconds[0], 4), 'warm': round(float(np.median(seconds[1:])), 4) if repeat else None}
+
+
+def benchmark(rows, workdir, seed=0, repeat=5, chunksize=None):
+    """
+    Generate rows synthetic listings in workdir (reused when already there), build the artifacts and time
+    every page. Runs in the calling process and changes its working directory to workdir.
+    """
+    sys.path.insert(0, ROOT)
+    from benchmarks.synthetic import generate
+
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    for name in ['attractions.csv', 'sites']:
+        if not os.path.exists(name):
+            os.symlink(os.path.join(ROOT, name), name)
+
+    result = {'rows': rows, 'seed': seed, 'chunksize': chunksize}
+    generated = {'rows': rows, 'seed': seed}
+    if os.path.exists('synthetic.json') and read_json('synthetic.json') == generated:
+        result['generate_seconds'] = None
+    else:
+        start = time.perf_counter()
+        generate('new_york.csv', rows, seed)
+        result['generate_seconds'] = round(time.perf_counter() - start, 4)
+        with open('synthetic.json', 'w') as f:
+            json.dump(generated, f)
+    result['csv_bytes'] = os.path.getsize('new_york.csv')
+
+    result['stages'] = time_stages(chunksize)
+    result['pages'] = {name: time_page(module, answers, repeat) for name, (module, answers) in SCENARIOS.items()}
+    return result
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result):
+    print("{:,} listings".format(result['rows']))
+    for name, seconds in result['stages'].items():
+        print("  stage {:<30}{:>10.3f}s".format(name, seconds))
+    for name, seconds in result['pages'].items():
+        print("  page  {:<30}{:>10.3f}s cold {:>10.3f}s warm".format(name, seconds['cold'], seconds['warm'] or 0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the build stages and the data side of every page on "
+                                                 "synthetic listings, results are written as JSON")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000],
+                        help="sizes of the synthetic datasets, e.g. 10000 100000 1000000 10000000")
+    parser.add_argument('--repeat', type=int, default=5, help="page views timed after the first one")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunksize', type=int, default=None, help="rows per chunk of the build, default all")
+    parser.add_argument('--workdir', default=None,
+                        help="directory to keep the generated data and artifacts in, default a temporary one")
+    parser.add_argument('--output', default=None, help="JSON file to write, default benchmarks/results/<time>.json")
+    args = parser.parse_args(argv)
+
+    report = {'started': datetime.now(timezone.utc).isoformat(), 'commit': git_commit(),
+              'python': platform.python_version(), 'platform': platform.platform(), 'runs': []}
+    for rows in args.rows:
+        workdir = os.path.join(args.workdir, str(rows)) if args.workdir else tempfile.mkdtemp(prefix='benchmark-')
+        try:
+            # every size gets a fresh process, so caches and memory of the previous one do not leak into it
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                result = pool.submit(benchmark, rows, os.path.abspath(workdir), args.seed, args.repeat,
+                                     args.chunksize).result()
+        finally:
+            if not args.workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+        print_result(result)
+        report['runs'].append(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print("Results written to {}".format(output))
+
+
+if __name__ == '__main__':
+    main()
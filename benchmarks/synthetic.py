@@ -0,0 +1,156 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+# (name, latitude, longitude, share of the listings, zipcode, price factor) of the generated neighbourhoods
+NEIGHBOURHOODS = [
+    ("Manhattan", 40.7590, -73.9845, 8.0, '10019', 1.4),
+    ("Midtown", 40.7549, -73.9840, 5.0, '10018', 1.5),
+    ("Hell's Kitchen", 40.7638, -73.9918, 4.0, '10036', 1.4),
+    ("Chelsea", 40.7465, -74.0014, 3.0, '10011', 1.6),
+    ("Greenwich Village", 40.7336, -74.0027, 2.0, '10014', 1.6),
+    ("East Village", 40.7265, -73.9815, 4.0, '10009', 1.3),
+    ("Lower East Side", 40.7150, -73.9843, 3.0, '10002', 1.2),
+    ("SoHo", 40.7233, -74.0030, 1.5, '10012', 1.8),
+    ("Tribeca", 40.7163, -74.0086, 1.0, '10013', 2.0),
+    ("Financial District", 40.7075, -74.0113, 2.0, '10004', 1.5),
+    ("Chinatown", 40.7158, -73.9970, 1.0, '10013', 1.1),
+    ("Upper West Side", 40.7870, -73.9754, 5.0, '10024', 1.3),
+    ("Upper East Side", 40.7736, -73.9566, 5.0, '10021', 1.3),
+    ("Harlem", 40.8116, -73.9465, 5.0, '10027', 0.9),
+    ("East Harlem", 40.7957, -73.9389, 2.5, '10029', 0.9),
+    ("Washington Heights", 40.8417, -73.9394, 3.0, '10032', 0.8),
+    ("Inwood", 40.8677, -73.9212, 1.0, '10034', 0.8),
+    ("Murray Hill", 40.7479, -73.9757, 2.0, '10016', 1.3),
+    ("Kips Bay", 40.7420, -73.9800, 1.0, '10016', 1.3),
+    ("Gramercy Park", 40.7368, -73.9845, 1.0, '10003', 1.4),
+    ("Flatiron District", 40.7411, -73.9897, 0.5, '10010', 1.6),
+    ("Nolita", 40.7229, -73.9955, 0.7, '10012', 1.5),
+    ("West Village", 40.7358, -74.0036, 2.0, '10014', 1.7),
+    ("Williamsburg", 40.7081, -73.9571, 8.0, '11211', 1.1),
+    ("Bedford-Stuyvesant", 40.6872, -73.9418, 7.0, '11216', 0.8),
+    ("Bushwick", 40.6944, -73.9213, 5.0, '11221', 0.7),
+    ("Greenpoint", 40.7304, -73.9515, 2.5, '11222', 1.0),
+    ("Crown Heights", 40.6694, -73.9422, 4.0, '11213', 0.8),
+    ("Park Slope", 40.6710, -73.9814, 2.0, '11215', 1.1),
+    ("Clinton Hill", 40.6897, -73.9661, 1.5, '11205', 1.0),
+    ("Fort Greene", 40.6921, -73.9742, 1.2, '11205', 1.1),
+    ("Prospect Heights", 40.6775, -73.9692, 1.0, '11238', 1.0),
+    ("Flatbush", 40.6409, -73.9624, 2.0, '11226', 0.7),
+    ("Sunset Park", 40.6455, -74.0124, 1.0, '11220', 0.7),
+    ("Bay Ridge", 40.6264, -74.0299, 0.6, '11209', 0.7),
+    ("Brooklyn Heights", 40.6960, -73.9936, 0.7, '11201', 1.3),
+    ("DUMBO", 40.7033, -73.9881, 0.3, '11201', 1.5),
+    ("Red Hook", 40.6734, -74.0083, 0.3, '11231', 0.9),
+    ("Astoria", 40.7644, -73.9235, 4.0, '11102', 0.8),
+    ("Long Island City", 40.7447, -73.9485, 2.0, '11101', 1.0),
+    ("Sunnyside", 40.7433, -73.9196, 1.0, '11104', 0.7),
+    ("Ridgewood", 40.7043, -73.9018, 1.5, '11385', 0.7),
+    ("Jackson Heights", 40.7557, -73.8831, 1.0, '11372', 0.6),
+    ("Flushing", 40.7675, -73.8331, 1.0, '11354', 0.6),
+    ("Jamaica", 40.7027, -73.7890, 1.0, '11432', 0.6),
+    ("Forest Hills", 40.7181, -73.8448, 0.5, '11375', 0.7),
+    ("Mott Haven", 40.8091, -73.9229, 0.5, '10454', 0.6),
+    ("Concourse", 40.8340, -73.9182, 0.5, '10451', 0.6),
+    ("Riverdale", 40.8940, -73.9114, 0.3, '10471', 0.7),
+    ("St. George", 40.6437, -74.0736, 0.3, '10301', 0.6),
+    ("Coney Island", 40.5755, -73.9707, 0.3, '11224', 0.6),
+]
+
+# (name, share of the listings offering it) of the generated amenities
+AMENITIES = [
+    ("Wifi", 0.95), ("Essentials", 0.9), ("Heating", 0.9), ("Kitchen", 0.85), ("Smoke detector", 0.8),
+    ("Air conditioning", 0.8), ("Hangers", 0.7), ("Shampoo", 0.7), ("Hair dryer", 0.6), ("Iron", 0.6),
+    ("Laptop friendly workspace", 0.6), ("TV", 0.6), ("Carbon monoxide detector", 0.6), ("Hot water", 0.5),
+    ("Fire extinguisher", 0.4), ("Refrigerator", 0.4), ("Washer", 0.4), ("Dryer", 0.4), ("Microwave", 0.35),
+    ("Cable TV", 0.35), ("Coffee maker", 0.35), ("Dishes and silverware", 0.35), ("Cooking basics", 0.3),
+    ("Elevator", 0.3), ("Stove", 0.3), ("Oven", 0.3), ("Bed linens", 0.3), ("First aid kit", 0.3),
+    ("Lock on bedroom door", 0.25), ("Private entrance", 0.2), ("Family/kid friendly", 0.2), ("Dishwasher", 0.15),
+    ("Buzzer/wireless intercom", 0.15), ("Free street parking", 0.15), ("Extra pillows and blankets", 0.15),
+    ("Luggage dropoff allowed", 0.12), ("Self check-in", 0.12), ("Long term stays allowed", 0.12),
+    ("Lockbox", 0.1), ("Pets allowed", 0.08), ("Gym", 0.08), ("Doorman", 0.06), ("Patio or balcony", 0.06),
+    ("Breakfast", 0.05), ("Indoor fireplace", 0.03), ("Pool", 0.02), ("Hot tub", 0.02),
+    ("translation missing: en.hosting_amenity_49", 0.1), ("translation missing: en.hosting_amenity_50", 0.1),
+]
+
+
+def amenity_strings(offered, names):
+    """
+    '{TV,"Cable TV",...}' strings of the Inside-Airbnb export from a (listings x amenities) boolean matrix
+    """
+    quoted = np.array([name if name.isalnum() else '"' + name + '"' for name in names], dtype=object)
+    return ['{' + ','.join(quoted[row]) + '}' for row in offered]
+
+
+def listings(rows, rng, start=0):
+    """
+    Frame of rows synthetic listings in the layout of new_york.csv, indexed from start
+    """
+    names, lat, lon, weight, zipcodes, factor = (np.array(values) for values in zip(*NEIGHBOURHOODS))
+    weight = weight.astype(float) / weight.astype(float).sum()
+    neighbourhood = rng.choice(len(names), size=rows, p=weight)
+
+    price = np.minimum(rng.lognormal(np.log(110 * factor.astype(float)[neighbourhood]), 0.6), 10000).round()
+    price_text = pd.Series(price).map('${:,.2f}'.format)
+    price_text[rng.random(rows) < 0.005] = np.nan
+    price_text[rng.random(rows) < 0.002] = '$0.00'
+
+    rating = np.clip(100 - rng.gamma(1.5, 4, rows), 20, 100).round()
+    rating[rng.random(rows) < 0.2] = np.nan
+
+    response = np.where(rng.random(rows) < 0.7, 100, rng.integers(0, 100, rows))
+    response_text = pd.Series(response).map('{}%'.format)
+    response_text[rng.random(rows) < 0.15] = np.nan
+
+    reviews = rng.gamma(1.0, 1.3, rows).round(2)
+    reviews[rng.random(rows) < 0.2] = np.nan
+
+    zipcode = pd.Series(zipcodes[neighbourhood], dtype=object)
+    extended = rng.random(rows) < 0.02
+    zipcode[extended] = zipcode[extended] + '-' + pd.Series(rng.integers(1000, 9999, rows)).astype(str)[extended]
+    zipcode[rng.random(rows) < 0.03] = np.nan
+
+    amenity_names, shares = zip(*AMENITIES)
+    offered = rng.random((rows, len(amenity_names))) < np.array(shares)
+
+    return pd.DataFrame({
+        'id_listings': np.arange(start, start + rows) + 2500,
+        'name': 'Synthetic listing',
+        'neighbourhood': names[neighbourhood],
+        'latitude': (lat.astype(float)[neighbourhood] + rng.normal(0, 0.008, rows)).round(6),
+        'longitude': (lon.astype(float)[neighbourhood] + rng.normal(0, 0.01, rows)).round(6),
+        'price': price_text.to_numpy(),
+        'review_scores_rating': rating,
+        'host_response_rate': response_text.to_numpy(),
+        'reviews_per_month': reviews,
+        'amenities': amenity_strings(offered, amenity_names),
+        'zipcode': zipcode.to_numpy(),
+        'description': 'A synthetic listing generated for benchmarking.',
+    }, index=pd.RangeIndex(start, start + rows))
+
+
+def generate(path, rows, seed=0, chunksize=500000):
+    """
+    Write rows synthetic listings to path in the format of the raw new_york.csv, chunksize rows at a time
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunksize):
+        chunk = listings(min(chunksize, rows - start), rng, start)
+        chunk.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic new_york.csv of NYC Airbnb listings")
+    parser.add_argument('rows', type=int, help="number of listings, e.g. 10000 to 10000000")
+    parser.add_argument('--output', default='new_york.csv')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    generate(args.output, args.rows, args.seed)
+    print("Wrote {} listings to {} in {:.1f}s".format(args.rows, args.output, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
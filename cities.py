@@ -0,0 +1,49 @@
+import os
+from artifacts import ARTIFACTS_DIR
+
+# Inside-Airbnb cities served by the app. raw_path and attractions_path are the files the build reads,
+# min_count is the number of listings an amenity needs to become a price model feature, center is
+# where the maps open, sites are the pictures of the attractions in the order of attractions_path and
+# region is appended to neighbourhood names when they are geocoded.
+CITIES = {
+    'new_york': {
+        'name': "New York City",
+        'raw_path': 'new_york.csv',
+        'attractions_path': 'attractions.csv',
+        'min_count': 1090,
+        'center': [40.730610, -73.935242],
+        'region': "New York",
+        'sites': ["sites/statue_of_liberty.PNG",
+                  "sites/central_park.PNG",
+                  "sites/Top_of_the_Rock.PNG",
+                  "sites/Rockefeller_Center.PNG",
+                  "sites/Metropolitan_measum.PNG",
+                  "sites/Broadway.PNG",
+                  "sites/empire_state.PNG",
+                  "sites/9-11.PNG",
+                  "sites/high_line.PNG",
+                  "sites/times_squars.PNG",
+                  "sites/brooklin_bridge.PNG",
+                  "sites/fifth_avenue.PNG",
+                  "sites/central_terminal.PNG",
+                  "sites/one_world_obd.PNG",
+                  "sites/the_frick.PNG",
+                  "sites/library.PNG"],
+    },
+}
+
+DEFAULT_CITY = 'new_york'
+
+# keys of a city config that replace the sources and params of the build stages
+BUILD_KEYS = ('raw_path', 'attractions_path', 'min_count')
+
+
+def city_directory(city, directory=ARTIFACTS_DIR):
+    """
+    Directory the artifacts of the city are built into and loaded from
+    """
+    return os.path.join(directory, city)
+
+
+def build_overrides(city):
+    return {key: CITIES[city][key] for key in BUILD_KEYS}
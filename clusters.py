@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import ConvexHull
+from sklearn.cluster import MiniBatchKMeans
+
+# columns the listings are clustered on and the numbers of clusters offered on the investment page
+FEATURES = ['price', 'zipcode']
+CLUSTER_COUNTS = list(range(2, 11))
+
+
+def label_column(k):
+    return 'k{}'.format(k)
+
+
+def fit_clusters(df_clust, k, random_state=0, batch_size=4096):
+    """
+    Mini-batch k-means of the listings on FEATURES. Clusters are numbered from the cheapest to the
+    most expensive on average, so that the numbering is stable across runs and comparable across k.
+    Returns the cluster of every listing and the centroids in that order.
+    """
+    X = df_clust[FEATURES].to_numpy(dtype=float)
+    kmeans = MiniBatchKMeans(n_clusters=k, random_state=random_state, batch_size=batch_size).fit(X)
+
+    price = df_clust['price'].to_numpy(dtype=float)
+    sizes = np.bincount(kmeans.labels_, minlength=k)
+    means = np.bincount(kmeans.labels_, weights=price, minlength=k) / np.maximum(sizes, 1)
+    order = np.argsort(means, kind='stable')
+    rank = np.empty(k, dtype=np.int64)
+    rank[order] = np.arange(k)
+    return rank[kmeans.labels_], kmeans.cluster_centers_[order]
+
+
+def cluster_table(df_clust, counts=CLUSTER_COUNTS, random_state=0):
+    """
+    Cluster labels of every listing for each k, one column per k, and a frame with the centroid and
+    the price statistics of every cluster
+    """
+    labels = pd.DataFrame(index=df_clust.index)
+    stats = []
+    for k in counts:
+        label, centroids = fit_clusters(df_clust, k, random_state)
+        labels[label_column(k)] = label.astype(np.uint8)
+
+        price = df_clust['price'].groupby(label)
+        summary = price.agg(['size', 'mean', 'median', 'min', 'max']).reindex(range(k))
+        summary.columns = ['count', 'mean_price', 'median_price', 'min_price', 'max_price']
+        summary['mean_distance'] = df_clust['distance'].groupby(label).mean().reindex(range(k))
+        summary['count'] = summary['count'].fillna(0).astype(int)
+        for i, feature in enumerate(FEATURES):
+            summary['centroid_' + feature] = centroids[:, i]
+        stats.append(summary.rename_axis('cluster').reset_index().assign(k=k))
+
+    stats = pd.concat(stats, ignore_index=True)
+    return labels, stats[['k'] + [column for column in stats.columns if column != 'k']]
+
+
+def hull(lat, lon, margin=0.0005):
+    """
+    Closed [longitude, latitude] ring of the convex hull of the points, every point taken as a square
+    of half side margin (degrees) so that single listings and listings on a line still get an area
+    """
+    points = np.unique(np.stack([lon, lat], axis=1), axis=0)
+    corners = (points[:, np.newaxis, :] + margin * np.array([[-1, -1], [-1, 1], [1, 1], [1, -1]])).reshape(-1, 2)
+    ring = corners[ConvexHull(corners).vertices]
+    return np.vstack([ring, ring[:1]]).round(5).tolist()
+
+
+def cluster_shapes(df_clust, labels, stats):
+    """
+    GeoJSON FeatureCollection per k (keyed by str(k)) with one feature per cluster: a MultiPolygon
+    made of the convex hull of the cluster's listings in every zip code, and the cluster statistics
+    """
+    lat = df_clust['latitude'].to_numpy(dtype=float)
+    lon = df_clust['longitude'].to_numpy(dtype=float)
+    zipcode = df_clust['zipcode'].to_numpy()
+
+    shapes = {}
+    for k, clusters in stats.groupby('k'):
+        label = labels[label_column(k)].to_numpy()
+        features = []
+        for row in clusters[clusters['count'] > 0].itertuples():
+            members = np.flatnonzero(label == row.cluster)
+            polygons = [[hull(lat[members[group]], lon[members[group]])]
+                        for group in pd.Series(members).groupby(zipcode[members]).indices.values()]
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'MultiPolygon', 'coordinates': polygons},
+                'properties': {'cluster': int(row.cluster), 'count': int(row.count),
+                               'mean_price': round(float(row.mean_price), 2),
+                               'median_price': round(float(row.median_price), 2),
+                               'mean_distance': round(float(row.mean_distance), 2)},
+            })
+        shapes[str(k)] = {'type': 'FeatureCollection', 'features': features}
+    return shapes
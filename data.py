@@ -0,0 +1,55 @@
+from functools import lru_cache
+from artifacts import ARTIFACTS_DIR, load_artifact
+from store import ListingStore
+
+# objects built from an artifact once per process and shared like it, pages declare them in ARTIFACTS
+# with the columns of the artifact they read through them: name -> (artifact, function building it)
+DERIVED = {'listing_store': ('df_listings', ListingStore)}
+
+
+@lru_cache(maxsize=None)
+def artifact(name, columns=None, directory=ARTIFACTS_DIR):
+    """
+    The artifact, or only the given tuple of columns of it, loaded on first use and then shared by
+    every session of the process. Pages must not modify what they get.
+    """
+    return load_artifact(name, directory, columns=list(columns) if columns is not None else None)
+
+
+@lru_cache(maxsize=None)
+def derived(name, columns=None, directory=ARTIFACTS_DIR):
+    """
+    The DERIVED object of the artifact loaded by artifact() with the same columns
+    """
+    source, build = DERIVED[name]
+    return build(artifact(source, columns, directory))
+
+
+def declared_columns(declarations):
+    """
+    Columns to load of every artifact for several ARTIFACTS declarations, the union of the columns
+    each one reads in order of first mention, or None when one of them reads all of them
+    """
+    columns = {}
+    for artifacts in declarations:
+        for name, read in artifacts.items():
+            name = DERIVED[name][0] if name in DERIVED else name
+            if name in columns and columns[name] is None:
+                continue
+            if read is None:
+                columns[name] = None
+            else:
+                columns[name] = tuple(dict.fromkeys(columns.get(name, ()) + tuple(read)))
+    return columns
+
+
+def page_data(artifacts, directory=ARTIFACTS_DIR, declarations=None):
+    """
+    Keyword arguments of a page's app from its ARTIFACTS declaration, a dict of artifact name to the
+    list of columns the page reads (None for all of them), loaded from directory. With the declarations
+    of every page, each artifact is loaded once with the columns all of them read and every page gets
+    that same frame, holding the columns it declared and possibly more.
+    """
+    columns = declared_columns(declarations or [artifacts])
+    return {name: derived(name, columns[DERIVED[name][0]], directory) if name in DERIVED
+            else artifact(name, columns[name], directory) for name in artifacts}
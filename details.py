@@ -1,6 +1,10 @@
 import streamlit as st
 
-def app():
+# artifacts passed to app, with the columns read from them
+ARTIFACTS = {}
+
+
+def app(city):
     st.header("Explainer Notebook")
     st.markdown(
         "If you are interested in the technical details, our implementations are available as a Jupyter Notebook.")
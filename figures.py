@@ -0,0 +1,53 @@
+import json
+import plotly.graph_objects as go
+import plotly.express as px
+
+# figures of the statistics page in the order they are shown
+STATISTICS_FIGURES = ['listings', 'listings_without_manhattan', 'price', 'rating', 'amenities']
+
+
+def spec(fig):
+    """
+    Plain JSON description of a plotly figure, go.Figure(spec) gives the figure back
+    """
+    return json.loads(fig.to_json())
+
+
+def count_figure(df_count):
+    fig = px.bar(df_count, x='neighbourhood', y='count')
+    fig.update_layout(autosize=False, width=1400, height=500, xaxis_title="Focus Neighbourhoods",
+                      yaxis_title="Number of Listings")
+    fig.update_traces(marker_color='#428DB2', marker_line_color='#428DB2',
+                      marker_line_width=1.5, opacity=0.8)
+    return fig
+
+
+def overlay_figure(df_neigh, bin_column, focus_neighs, height, xaxis_title):
+    """
+    One bar trace per focus neighbourhood over the bins of a wide histogram frame, drawn on top of each other
+    """
+    bar = []
+    for neigh in focus_neighs:
+        bar.append(go.Bar(name=neigh, x=df_neigh[bin_column], y=df_neigh[neigh], marker=dict(colorscale='viridis'),
+                          marker_line_width=2, opacity=0.5))
+
+    fig = go.Figure(data=bar)
+    fig.update_layout(barmode='overlay', autosize=False, width=1400, height=height, xaxis_title=xaxis_title,
+                      yaxis_title="Relative Frequency")
+    return fig
+
+
+def statistics_figures(df_count, df_neigh_price, df_neigh_rating, df_neigh_amenities, focus_neighs):
+    """
+    Specs of every figure of the statistics page by name, see STATISTICS_FIGURES. None of them depends
+    on user input, so they are built once with the artifacts.
+    """
+    figures = {
+        'listings': count_figure(df_count),
+        # Manhattan holds a large share of the listings and flattens every other bar
+        'listings_without_manhattan': count_figure(df_count[df_count['neighbourhood'] != 'Manhattan']),
+        'price': overlay_figure(df_neigh_price, 'round_price', focus_neighs, 600, "Price"),
+        'rating': overlay_figure(df_neigh_rating, 'round_rating', focus_neighs, 500, "Rating"),
+        'amenities': overlay_figure(df_neigh_amenities, 'round_amenities', focus_neighs, 500, "Amenities"),
+    }
+    return {name: spec(figures[name]) for name in STATISTICS_FIGURES}
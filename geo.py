@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+R = 6371  # Radius of earth in kilometers. Use 3956 for miles
+
+
+def haversine_np(lat1, lon1, lat2, lon2):
+    """
+    Calculate the great circle distance between two sets of points
+    on the earth (specified in decimal degrees). Arguments broadcast
+    like numpy arrays, so one call covers a whole column.
+    """
+    # convert decimal degrees to radians
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+
+    # haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arcsin(np.sqrt(a))
+    return c * R
+
+
+def attractions_center(df_attractions):
+    """
+    Average position of the attractions, used as the reference point of the "distance" column
+    """
+    return df_attractions.latitude.mean(), df_attractions.longitude.mean()
+
+
+def distance_to_center(df_attractions, lat, lon):
+    """
+    Distance in km from the attractions center to every (lat, lon) pair
+    """
+    lat_c, lon_c = attractions_center(df_attractions)
+    return haversine_np(lat_c, lon_c, np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+
+
+def distance_matrix(lat, lon, df_attractions):
+    """
+    Listings x attractions matrix of distances in km
+    """
+    lat = np.asarray(lat, dtype=float)[:, np.newaxis]
+    lon = np.asarray(lon, dtype=float)[:, np.newaxis]
+    return haversine_np(lat, lon, df_attractions.latitude.to_numpy()[np.newaxis, :],
+                        df_attractions.longitude.to_numpy()[np.newaxis, :])
+
+
+def attraction_features(df_listings, df_attractions):
+    """
+    Distance to the attractions center, to every single attraction and to the nearest one
+    for each listing, indexed like df_listings
+    """
+    lat = df_listings['latitude'].to_numpy(dtype=float)
+    lon = df_listings['longitude'].to_numpy(dtype=float)
+
+    matrix = distance_matrix(lat, lon, df_attractions)
+    nearest = matrix.argmin(axis=1)
+
+    features = pd.DataFrame(matrix, index=df_listings.index,
+                            columns=['distance_' + str(i) for i in range(len(df_attractions))])
+    features.insert(0, 'distance', distance_to_center(df_attractions, lat, lon))
+    features['nearest_attraction'] = df_attractions.Attraction.to_numpy()[nearest]
+    features['nearest_distance'] = matrix[np.arange(len(matrix)), nearest]
+    return features
+
+
+def neighbourhood_gazetteer(df_listings):
+    """
+    Centroid and bounding box of the listings of every neighbourhood
+    """
+    grouped = df_listings.groupby('neighbourhood', observed=True)
+    gazetteer = grouped.agg(latitude=('latitude', 'mean'), longitude=('longitude', 'mean'),
+                            lat_min=('latitude', 'min'), lat_max=('latitude', 'max'),
+                            lon_min=('longitude', 'min'), lon_max=('longitude', 'max'),
+                            listings=('latitude', 'size'))
+    gazetteer.index = gazetteer.index.astype(str)
+    return gazetteer
+
+
+def locate(gazetteer, neighbourhood, geocoder=None, region="New York"):
+    """
+    (latitude, longitude) of a neighbourhood from the gazetteer. Unknown names are only
+    geocoded online when a geopy geocoder is passed explicitly.
+    """
+    if neighbourhood in gazetteer.index:
+        row = gazetteer.loc[neighbourhood]
+        return float(row.latitude), float(row.longitude)
+    if geocoder is None:
+        raise KeyError("Unknown neighbourhood: " + neighbourhood)
+    location = geocoder.geocode(neighbourhood + ", " + region)
+    if location is None:
+        raise KeyError("Neighbourhood not found by the geocoder: " + neighbourhood)
+    return location.latitude, location.longitude
+
+
+def build_listing_index(df_listings):
+    """
+    Ball tree over the listing coordinates, queries return row positions in df_listings
+    """
+    return BallTree(np.radians(df_listings[['latitude', 'longitude']].to_numpy(dtype=float)), metric='haversine')
+
+
+def within_radius(index, lat, lon, radius_km):
+    """
+    Row positions and distances in km of the listings within radius_km of (lat, lon), nearest first
+    """
+    positions, distances = index.query_radius(np.radians([[lat, lon]]), r=radius_km / R, return_distance=True,
+                                              sort_results=True)
+    return positions[0], distances[0] * R
+
+
+def nearest_listings(index, lat, lon, k):
+    """
+    Row positions and distances in km of the k listings nearest to (lat, lon), nearest first
+    """
+    distances, positions = index.query(np.radians([[lat, lon]]), k=min(k, index.data.shape[0]))
+    return positions[0], distances[0] * R
+
+
+# cell sizes in degrees of the heat map grids built by default, each level halves the previous one like a quadtree
+HEATMAP_CELLS = [0.02, 0.01, 0.005, 0.0025]
+
+
+def density_pyramid(df_listings, cells):
+    """
+    Number of listings per grid cell for every cell size, one row per non-empty cell with the
+    cell center as latitude/longitude
+    """
+    lat = df_listings['latitude'].to_numpy(dtype=float)
+    lon = df_listings['longitude'].to_numpy(dtype=float)
+
+    levels = []
+    for level, cell in enumerate(cells):
+        rows = np.floor(lat / cell).astype(np.int64)
+        cols = np.floor(lon / cell).astype(np.int64)
+        keys, counts = np.unique(np.stack([rows, cols], axis=1), axis=0, return_counts=True)
+        levels.append(pd.DataFrame({'level': level, 'cell': cell,
+                                    'latitude': (keys[:, 0] + 0.5) * cell, 'longitude': (keys[:, 1] + 0.5) * cell,
+                                    'count': counts}))
+    return pd.concat(levels, ignore_index=True)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+
+def round_up(values, width):
+    """
+    Upper edge of the bin of the given width every value falls in, e.g. 120 -> 200 for width 100
+    """
+    return np.ceil(np.asarray(values, dtype=float) / width) * width
+
+
+def grouped_histograms(df, metrics, by='neighbourhood', normalize=True):
+    """
+    Per-group distributions of several columns in one pass over the groups.
+
+    metrics maps the name of the bin column to a (column, bin width) pair, e.g.
+    {'round_price': ('price', 100)}. For every metric a wide frame is returned with the bin
+    labels as strings in that column and one column per group, in order of appearance,
+    holding the share of the group's listings in each bin (or the count with normalize=False).
+    Bins a group has no listing in are NaN.
+    """
+    groups, names = pd.factorize(df[by])
+    sizes = np.bincount(groups[groups >= 0], minlength=len(names))
+
+    histograms = {}
+    for label, (column, width) in metrics.items():
+        bins = round_up(df[column], width)
+        valid = (groups >= 0) & ~np.isnan(bins)
+        edges, codes = np.unique(bins[valid], return_inverse=True)
+
+        counts = np.bincount(groups[valid] * len(edges) + codes, minlength=len(names) * len(edges))
+        counts = counts.reshape(len(names), len(edges)).T.astype(float)
+        if normalize:
+            counts /= sizes
+        counts[counts == 0] = np.nan
+
+        wide = pd.DataFrame(counts, columns=list(names))
+        wide.insert(0, label, edges.astype(int).astype(str))
+        histograms[label] = wide
+    return histograms
@@ -0,0 +1,180 @@
+import contextlib
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# instrumentation is off unless AIRBNB_METRICS is set, measure() then returns a shared no-op context
+ENABLED = os.environ.get('AIRBNB_METRICS', '') not in ('', '0')
+# JSON lines log of every measurement, rotated at LOG_BYTES
+LOG_PATH = os.environ.get('AIRBNB_METRICS_LOG', 'metrics.log')
+LOG_BYTES = 1 << 20
+LOG_BACKUPS = 5
+# port of the local Prometheus text endpoint the app serves, none when unset
+PORT = os.environ.get('AIRBNB_METRICS_PORT')
+
+_DISABLED = contextlib.nullcontext()
+_local = threading.local()
+_lock = threading.Lock()
+_recent = deque(maxlen=200)
+_totals = {}
+_logger = None
+_server = None
+
+
+def measure(kind, name, **labels):
+    """
+    Context manager recording the wall time and the peak memory allocated by Python (tracemalloc)
+    of the block as a kind ('page', 'step' or 'stage') measurement. Peaks of nested blocks are
+    included in the outer ones. tracemalloc is process wide, so sessions running at the same time
+    add to each other's peaks.
+    """
+    if not ENABLED:
+        return _DISABLED
+    return _measure(kind, name, labels)
+
+
+def annotate(**labels):
+    """
+    Add labels, e.g. the widget inputs, to the outermost measurement running in this thread
+    """
+    if ENABLED and _stack():
+        _stack()[0]['labels'].update(labels)
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@contextlib.contextmanager
+def _measure(kind, name, labels):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    stack = _stack()
+
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        # the peak so far belongs to the enclosing block, keep it before resetting
+        stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    entry = {'labels': dict(labels), 'base': current, 'peak': current}
+    stack.append(entry)
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        peak = max(tracemalloc.get_traced_memory()[1], entry['peak'])
+        stack.pop()
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        record(kind, name, entry['labels'], seconds, max(peak - entry['base'], 0))
+
+
+def record(kind, name, labels, seconds, peak_bytes):
+    """
+    Log a measurement and add it to the totals served by the metrics endpoint
+    """
+    measurement = {'time': datetime.now(timezone.utc).isoformat(), 'kind': kind, 'name': name,
+                   'labels': labels, 'seconds': round(seconds, 6), 'peak_bytes': int(peak_bytes)}
+    with _lock:
+        _recent.append(measurement)
+        count, total, slowest, peak = _totals.get((kind, name), (0, 0.0, 0.0, 0))
+        _totals[(kind, name)] = (count + 1, total + seconds, max(slowest, seconds), max(peak, int(peak_bytes)))
+    logger().info(json.dumps(measurement, default=str))
+
+
+def logger():
+    global _logger
+    if _logger is None:
+        with _lock:
+            if _logger is None:
+                handler = logging.handlers.RotatingFileHandler(LOG_PATH, maxBytes=LOG_BYTES, backupCount=LOG_BACKUPS)
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                log = logging.getLogger('airbnb.metrics')
+                log.setLevel(logging.INFO)
+                log.propagate = False
+                log.addHandler(handler)
+                _logger = log
+    return _logger
+
+
+def recent():
+    """
+    The last measurements of the process, oldest first
+    """
+    with _lock:
+        return list(_recent)
+
+
+def metrics_text():
+    """
+    Totals per measurement in the Prometheus text format
+    """
+    with _lock:
+        totals = sorted(_totals.items())
+    lines = []
+    for metric, kind, position in [('airbnb_calls_total', 'counter', 0), ('airbnb_seconds_total', 'counter', 1),
+                                   ('airbnb_seconds_max', 'gauge', 2), ('airbnb_peak_bytes_max', 'gauge', 3)]:
+        lines.append('# TYPE {} {}'.format(metric, kind))
+        for (kind_, name), values in totals:
+            lines.append('{}{{kind="{}",name="{}"}} {}'.format(metric, kind_, name.replace('"', '\\"'), values[position]))
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = metrics_text().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    """
+    Serve /metrics on localhost:PORT from a daemon thread, once per process, when instrumentation is
+    on. Only the app starts it. When the port is taken, e.g. by another worker, this is logged once
+    and the measurements are still written to the log.
+    """
+    global _server
+    if not ENABLED or PORT is None or _server is not None:
+        return
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(('127.0.0.1', int(PORT)), MetricsHandler)
+            except OSError as error:
+                # never retried, every later call returns at once
+                _server = False
+                logging.getLogger(__name__).warning("Metrics endpoint not started on port %s: %s", PORT, error)
+                return
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+
+
+def debug_panel(st):
+    """
+    Sidebar checkbox showing the last measurements of the process, only when instrumentation is on
+    """
+    if ENABLED and st.sidebar.checkbox("Show performance metrics"):
+        import pandas as pd
+        rows = [dict(m, labels=json.dumps(m['labels'], default=str), peak_mb=round(m['peak_bytes'] / 2 ** 20, 2))
+                for m in reversed(recent())]
+        st.sidebar.dataframe(pd.DataFrame(rows, columns=['kind', 'name', 'labels', 'seconds', 'peak_mb']))
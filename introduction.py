@@ -1,30 +1,25 @@
-import base64
 import streamlit as st
 import folium
-from streamlit_folium import folium_static
-from folium import IFrame
+from attraction_layer import add_attractions
+from map_layers import render_map
+import pandas as pd
+from instrumentation import annotate, measure
 from folium.plugins import HeatMap
 
+# artifacts passed to app, with the columns read from them
+ARTIFACTS = {'df_attractions': None, 'heatmap': None}
 
-png = ["sites/statue_of_liberty.PNG",
-           "sites/central_park.PNG",
-           "sites/Top_of_the_Rock.PNG",
-           "sites/Rockefeller_Center.PNG",
-           "sites/Metropolitan_measum.PNG",
-           "sites/Broadway.PNG",
-           "sites/empire_state.PNG",
-           "sites/9-11.PNG",
-           "sites/high_line.PNG",
-           "sites/times_squars.PNG",
-           "sites/brooklin_bridge.PNG",
-           "sites/fifth_avenue.PNG",
-           "sites/central_terminal.PNG",
-           "sites/one_world_obd.PNG",
-           "sites/the_frick.PNG",
-           "sites/library.PNG"]
 
+@st.cache(allow_output_mutation=True, hash_funcs={pd.DataFrame: id})
+def get_heatmap(df_heatmap):
+    """
+    Cell size and [latitude, longitude, count] rows of every level of the density pyramid, by level
+    """
+    return {level: (df['cell'].iloc[0], df[['latitude', 'longitude', 'count']].to_numpy().tolist())
+            for level, df in df_heatmap.groupby('level')}
 
-def app(df_listings, df_attractions):
+
+def app(city, df_attractions, heatmap):
     html_temp = """
             <div><font color=\"#C8C8C8\" size=\"18\"><strong>Is there any connection between NY City's attraction and the Airbnb prices?</font></div><br>
             <div><font color=\"#C8C8C8\" size=\"6\">How many Airbnb listings are located in NY?</font></div>"""
@@ -35,31 +30,23 @@ def app(df_listings, df_attractions):
     "In the left menu you can find different interactive tools that illustrate geographically the variation of the different listings characteristics \(such as price, ratings, etc.\), "
     "as well as some other helpful apps.")
 
-    df_heatmap = df_listings.copy()
-    df_heatmap['count'] = 1
-    
     html_temp = """
             <div><font color=\"#C8C8C8\" size=\"6\">Heat Map of NY's Airbnb listings</font></div>"""
     st.markdown(html_temp, unsafe_allow_html=True)
     
-    map_hooray = folium.Map([40.730610, -73.935242], zoom_start=11, tiles="OpenStreetMap")
-    heatmap = HeatMap(data=df_heatmap[['latitude', 'longitude', 'count']].groupby(
-        ['latitude', 'longitude']).sum().reset_index().values.tolist(), radius=8, max_zoom=13)
+    # one level of the precomputed density pyramid per detail, labelled with its cell size (1 degree ~ 111 km)
+    levels = get_heatmap(heatmap)
+    level = st.select_slider("Heat map detail", options=list(levels), value=max(levels),
+                             format_func=lambda level: "{:.0f} m cells".format(levels[level][0] * 111000))
 
-    heatmap.add_to(map_hooray)
+    annotate(level=level)
 
-    popup = []
+    map_hooray = folium.Map(city['center'], zoom_start=11, tiles="OpenStreetMap")
+    with measure('step', 'introduction.heatmap'):
+        heatmap = HeatMap(data=levels[level][1], radius=8, max_zoom=13)
 
-    for i in range(len(png)):
-        encoded = base64.b64encode(open(png[i], 'rb').read()).decode()
-        building_name = df_attractions.Attraction[i]
-        html = building_name
-        html += '<img src="data:image/png[i];base64,{}" width="100" height="100">'.format(encoded)
-        iframe = IFrame(html, width=130, height=150)
-        popup.append(folium.Popup(iframe, max_width=130))
+    heatmap.add_to(map_hooray)
 
-    for i in range(len(png)):
-        folium.Marker([df_attractions.latitude[i], df_attractions.longitude[i]], popup=popup[i],
-                      icon=folium.Icon(color='blue', icon_color='white', icon='globe')).add_to(map_hooray)
+    add_attractions(map_hooray, df_attractions, city['sites'])
 
-    folium_static(map_hooray, width=1000, height=600)
\ No newline at end of file
+    render_map(map_hooray, width=1000, height=600)
\ No newline at end of file
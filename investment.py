@@ -1,13 +1,19 @@
 import streamlit as st
 import folium
-from branca.element import MacroElement, Template
-from sklearn.cluster import KMeans
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import MinMaxScaler
-from streamlit_folium import folium_static
 import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+from clusters import CLUSTER_COUNTS, label_column
+from map_layers import CircleLayer, Legend, render_map
+from instrumentation import annotate, measure
+
+# listings drawn on top of the cluster shapes when asked for
+SAMPLE_SIZE = 2000
+
+# artifacts passed to app, with the columns read from them
+ARTIFACTS = {'df_clust': ['latitude', 'longitude', 'price'], 'df_cluster_labels': None, 'cluster_shapes': None}
+
 
-def app(df_clust):
+def app(city, df_clust, df_cluster_labels, cluster_shapes):
     st.subheader("Real estate investment")
     st.markdown("Imagine that you run a real estate business and you want to invest in Airbnb. This application provides the "
                 "ability to find the most profitable location for your new house. All you have to do is to study the map below "
@@ -16,47 +22,37 @@ def app(df_clust):
                 "are ready to focus on a specific area of NY according to your business plan.")
 
 
-    X_train, X_test, = train_test_split(df_clust, test_size=0.05)
-    df_clustering = X_test.loc[:, X_test.columns.isin(['price', 'zipcode'])]
+    k = st.select_slider("Number of clusters", options=CLUSTER_COUNTS, value=10)
+    show_listings = st.checkbox("Show a sample of the listings")
+    annotate(k=k, show_listings=show_listings)
 
-    kmeans = KMeans(n_clusters=10, random_state=0)
-    clust = X_test[["latitude", "longitude", 'price', 'zipcode', 'distance']].copy()
-    clust = clust.assign(cluster=kmeans.fit_predict(df_clustering)[:, np.newaxis])
-    data = clust.copy()
-
-    ## create color column
-    lst_elements = sorted(list(clust['cluster'].unique()))
     lst_colors = ['#8A2BE2', '#FF7F50', '#7FFF00', '#D2691E', '#00FFFF', '#E9967A', '#2F4F4F', '#FF69B4', '#66CDAA', '#FFFF00']
-    data["color"] = data['cluster'].apply(lambda x:
-                                          lst_colors[lst_elements.index(x)])
-
-    x = clust.groupby(["cluster"]).mean('price')
+    features = cluster_shapes[str(k)]
 
-    ## create size column (scaled)
-    scaler = MinMaxScaler(feature_range=(6, 25))
-    data["size"] = scaler.fit_transform(clust['price'].values.reshape(-1, 1)).reshape(-1)
+    map_hooray = folium.Map(city['center'], zoom_start=11, tiles="cartodbpositron")
 
-    lat = 40.730610
-    lon = -73.935242
-    map_hooray = folium.Map([lat, lon], zoom_start=11, tiles="cartodbpositron")
+    ## add one shape per cluster: the hulls of its listings in every zip code
+    folium.GeoJson(features, name='clusters',
+                   style_function=lambda feature: {'color': lst_colors[feature['properties']['cluster']],
+                                                   'fillColor': lst_colors[feature['properties']['cluster']],
+                                                   'weight': 1, 'fillOpacity': 0.35},
+                   tooltip=folium.GeoJsonTooltip(fields=['cluster', 'count', 'mean_price', 'median_price', 'mean_distance'],
+                                                 aliases=['Cluster', 'Listings', 'Average price', 'Median price',
+                                                          'Average distance (km)'])).add_to(map_hooray)
 
     ## add points
-    data.apply(lambda row: folium.CircleMarker(
-        location=[row['latitude'], row['longitude']], popup="Price: "+str(round(row['price'])),
-        color=row["color"], fill=True,
-        radius=row["size"]).add_to(map_hooray), axis=1)
+    if show_listings:
+        with measure('step', 'investment.sample'):
+            # always the same listings, so the map does not change between reruns, and only they are copied
+            rows = np.random.RandomState(0).permutation(len(df_clust))[:SAMPLE_SIZE]
+            data = df_clust.iloc[rows].assign(color=df_cluster_labels[label_column(k)].to_numpy()[rows])
+            scaler = MinMaxScaler(feature_range=(3, 12))
+            data["size"] = scaler.fit_transform(data['price'].values.reshape(-1, 1)).reshape(-1)
+            CircleLayer(data, radius='size', color='color', popup='price', colors=lst_colors, label="Price: ").add_to(map_hooray)
 
     ## add html legend
-    legend_html = """{% macro html(this, kwargs) %} <div style="position:fixed; bottom:10px; left:10px; border:2px solid black; z-index:9999; font-size:14px;">&nbsp;<b>""" + 'cluster - average price' + """:</b><br>"""
-    for i in lst_elements:
-        legend_html = legend_html + """&nbsp;<i class="fa fa-circle 
-         fa-1x" style="color:""" + lst_colors[lst_elements.index(i)] + """">
-         </i>&nbsp;""" + str(i) + """: """ + str(round(x.iloc[i]['price'])) + """<br>"""
-    legend_html = legend_html + """</div> {% endmacro %}"""
-
-    macro = MacroElement()
-    macro._template = Template(legend_html)
-
-    map_hooray.add_child(macro)
+    Legend('cluster - average price', [(lst_colors[f['properties']['cluster']],
+                                         '{}: {:.0f}'.format(f['properties']['cluster'], f['properties']['mean_price']))
+                                        for f in features['features']]).add_to(map_hooray)
 
-    folium_static(map_hooray, width=1000, height=600)
\ No newline at end of file
+    render_map(map_hooray, width=1000, height=600)
@@ -1,108 +1,124 @@
-import base64
 import streamlit as st
 import plotly.express as px
 import folium
-from streamlit_folium import folium_static
-from folium import IFrame
-from folium.plugins import MarkerCluster
+from attraction_layer import add_attractions
+from map_layers import add_listing_markers, render_map
 import numpy as np
+import pandas as pd
+from geo import attractions_center, build_listing_index, nearest_listings, within_radius
+from ranking import Rankings
+from instrumentation import annotate, measure
 
 
-png = ["sites/statue_of_liberty.PNG",
-           "sites/central_park.PNG",
-           "sites/Top_of_the_Rock.PNG",
-           "sites/Rockefeller_Center.PNG",
-           "sites/Metropolitan_measum.PNG",
-           "sites/Broadway.PNG",
-           "sites/empire_state.PNG",
-           "sites/9-11.PNG",
-           "sites/high_line.PNG",
-           "sites/times_squars.PNG",
-           "sites/brooklin_bridge.PNG",
-           "sites/fifth_avenue.PNG",
-           "sites/central_terminal.PNG",
-           "sites/one_world_obd.PNG",
-           "sites/the_frick.PNG",
-           "sites/library.PNG"]
+AROUND = 'Around the attractions'
+CENTER = 'Center of the attractions'
+CUSTOM = 'Custom point'
 
-def app(df_listings, df_attractions):
+# columns of the listings the finder searches, ranks and shows on the map
+COLUMNS = ['neighbourhood', 'latitude', 'longitude', 'price', 'review_scores_rating', 'host_response_rate',
+           'reviews_per_month']
+
+# artifacts passed to app, with the columns read from them. The store shares the rows of df_listings,
+# positions from the listing index and the rankings select from it.
+ARTIFACTS = {'df_listings': COLUMNS, 'listing_store': COLUMNS, 'df_attractions': None}
+
+
+@st.cache(allow_output_mutation=True, hash_funcs={pd.DataFrame: id})
+def get_listing_index(df_listings):
+    return build_listing_index(df_listings)
+
+
+@st.cache(allow_output_mutation=True, hash_funcs={pd.DataFrame: id})
+def get_rankings(df_listings, parameters, orders):
+    return Rankings(df_listings, dict(zip(parameters, orders)))
+
+
+def app(city, df_listings, listing_store, df_attractions):
     
     st.sidebar.title('Selection')
     
-    neighs = df_listings['neighbourhood'].unique()
-    neighs = np.concatenate([['Radius from the attractions'], neighs])
+    neighs = listing_store.neighbourhoods
+    neighs = np.concatenate([[AROUND], neighs])
     
     queries = ['Lowest price', 'Highest score', 'Highest response rate', 'Popularity']
     parameters = ['price', 'review_scores_rating', 'host_response_rate', 'reviews_per_month']
     orders = [True, False, False, False]
     
-    lat_mean = df_attractions.latitude.mean()
-    lon_mean = df_attractions.longitude.mean()
-    
     rprt_status = st.sidebar.selectbox("Choose Radius or Neighbourhood", neighs)
     
-    if rprt_status == 'Radius from the attractions':
-        radius = st.sidebar.slider("Select a radius (km)", min_value=0.25, max_value=10.0, value=2.0, step=0.25)
-        filtered_data = df_listings[df_listings['distance'] < radius]
+    if rprt_status == AROUND:
+        center = st.sidebar.selectbox("Center of the search", [CENTER] + df_attractions.Attraction.tolist() + [CUSTOM])
+        if center == CENTER:
+            lat_center, lon_center = attractions_center(df_attractions)
+        elif center == CUSTOM:
+            lat_center = st.sidebar.number_input("Latitude", min_value=-90.0, max_value=90.0, value=city['center'][0],
+                                                 step=0.001, format="%.6f")
+            lon_center = st.sidebar.number_input("Longitude", min_value=-180.0, max_value=180.0, value=city['center'][1],
+                                                 step=0.001, format="%.6f")
+        else:
+            attraction = df_attractions[df_attractions.Attraction == center].iloc[0]
+            lat_center, lon_center = attraction.latitude, attraction.longitude
+
+        search = st.sidebar.radio("Search", ['Within a radius', 'Nearest listings'])
+        if search == 'Within a radius':
+            radius = st.sidebar.slider("Select a radius (km)", min_value=0.25, max_value=10.0, value=2.0, step=0.25)
+            with measure('step', 'listing_finder.search'):
+                positions, _ = within_radius(get_listing_index(df_listings), lat_center, lon_center, radius)
+            annotate(center=center, radius=radius)
+        else:
+            k = st.sidebar.slider("Select a no. of nearest listings", min_value=1, max_value=500, value=50, step=1)
+            with measure('step', 'listing_finder.search'):
+                positions, distances = nearest_listings(get_listing_index(df_listings), lat_center, lon_center, k)
+            annotate(center=center, nearest=k)
+            radius = distances[-1] if len(distances) else 0
+        filtered_data = listing_store.frame(np.sort(positions), COLUMNS)
     else:
-        filtered_data = df_listings[df_listings['neighbourhood'] == rprt_status]
+        filtered_data = listing_store.frame(np.sort(listing_store.select(rprt_status)), COLUMNS)
     
+    annotate(area=rprt_status)
+
     container = st.sidebar.beta_container()
     selected_options = container.multiselect("Select one or more queries (by order of priority):",
                                                  queries)
     
     if selected_options:
         ordered_parameters = [parameters[queries.index(option)] for option in selected_options]
-        ordered_orders = [orders[queries.index(option)] for option in selected_options]
-        
-        filtered_data = filtered_data.sort_values(by=ordered_parameters, ascending=ordered_orders)
         
         no_listings = st.sidebar.slider("Select a no. of listings to show", min_value=1, max_value=50, value=25, step=1)
         
-        filtered_data = filtered_data.head(no_listings)
+        annotate(queries=ordered_parameters, listings=no_listings)
+        with measure('step', 'listing_finder.rank'):
+            rankings = get_rankings(df_listings, parameters, orders)
+            if rprt_status == AROUND:
+                top = rankings.top_n(ordered_parameters, no_listings, positions=positions)
+            else:
+                top = rankings.top_n(ordered_parameters, no_listings, group=rprt_status)
+        filtered_data = listing_store.frame(top, COLUMNS)
     
     st.subheader("Listing Finder")
     st.markdown(
         "In order to facilitate the task of finding a listing, we've created this tool will allow users to search for a listing based on their different preferences. "
-        "On the left side of the panel, you can select the neighbourhood you're insterested in, or select a radius in km from the center of NY's main attractions. "
+        "On the left side of the panel, you can select the neighbourhood you're insterested in, or search around NY's main attractions: within a radius in km or for the nearest listings to their center, a single attraction or a point of your choice. "
         "By default, the finder will show all the listings situated in the area selected. The user can then select a query to show a number (from 1 to 50) of listings that satisfy his/her requirements.   ")
 
     st.markdown("_Note: the order of the queries matters. The first query will be prioritised before the second and so on._"
         )
-    popup = []
-
-    for i in range(len(png)):
-        encoded = base64.b64encode(open(png[i], 'rb').read()).decode()
-        building_name = df_attractions.Attraction[i]
-        html = building_name
-        html += '<img src="data:image/png[i];base64,{}" width="100" height="100">'.format(encoded)
-        iframe = IFrame(html, width=130, height=150)
-        popup.append(folium.Popup(iframe, max_width=130))
+    map_hooray = folium.Map(city['center'], zoom_start=11, tiles="OpenStreetMap")
 
-    map_hooray = folium.Map([40.730610, -73.935242], zoom_start=11, tiles="OpenStreetMap")
-
-    for i in range(len(png)):
-        folium.Marker([df_attractions.latitude[i], df_attractions.longitude[i]], popup=popup[i],
-                      icon=folium.Icon(color='blue', icon_color='white', icon='globe')).add_to(map_hooray)
+    add_attractions(map_hooray, df_attractions, city['sites'])
     
-    if rprt_status == 'Radius from the attractions':
+    if rprt_status == AROUND:
         folium.Circle(
             radius=radius*1000,
-            location=[lat_mean, lon_mean],
+            location=[lat_center, lon_center],
             color="crimson",
             fill=True
         ).add_to(map_hooray)
     
-    # add a marker for every record in the filtered data, use a clustered view
-    marker_cluster = MarkerCluster().add_to(map_hooray)  # create marker clusters
-    for index, row in filtered_data.iterrows():
-        html = "Price: " + str(row.price) + "$" + "<br>" + "Rating: " + str(row.review_scores_rating) + "<br>" + \
-            "Response rate: " + str(row.host_response_rate) + "<br>" + "Reviews: " + str(row.reviews_per_month)
-
-        iframe = folium.IFrame(html, width=130, height=60)
-
-        new_pops = folium.Popup(iframe, max_width=130)
-
-        folium.Marker([row.latitude, row.longitude], radius=5, popup=new_pops, ).add_to(marker_cluster)
+    # add every record in the filtered data to a clustered view built in the browser
+    with measure('step', 'listing_finder.markers'):
+        add_listing_markers(map_hooray, filtered_data, [('Price', 'price', '$'), ('Rating', 'review_scores_rating', ''),
+                                                        ('Response rate', 'host_response_rate', ''),
+                                                        ('Reviews', 'reviews_per_month', '')])
         
-    folium_static(map_hooray, width=1000, height=600)
+    render_map(map_hooray, width=1000, height=600)
\ No newline at end of file
@@ -0,0 +1,101 @@
+import json
+import numpy as np
+import folium
+import streamlit.components.v1 as components
+from instrumentation import annotate, measure
+from branca.element import MacroElement, Template
+from folium.plugins import FastMarkerCluster
+
+
+def points(df, columns, precision=5):
+    """
+    Rows of [latitude, longitude, *columns] rounded for the browser, missing values as null
+    """
+    coordinates = df[['latitude', 'longitude']].to_numpy(dtype=float).round(precision)
+    values = df[columns].to_numpy(dtype=float).round(2)
+    data = np.hstack([coordinates, values]).astype(object)
+    data[np.isnan(data.astype(float))] = None
+    return data.tolist()
+
+
+def add_listing_markers(map_hooray, df, fields):
+    """
+    Add all listings of df to the map as one clustered layer. The markers and their popups are
+    built in the browser from a compact array, fields are the (label, column, unit) lines of the popup.
+    """
+    lines = ' + "<br>" + '.join('{} + row[{}] + {}'.format(json.dumps(label + ": "), i + 2, json.dumps(unit))
+                                 for i, (label, _, unit) in enumerate(fields))
+    callback = ("function (row) {"
+                "var marker = L.marker(new L.LatLng(row[0], row[1]));"
+                "marker.bindPopup(" + lines + ", {maxWidth: 130});"
+                "return marker;}")
+    FastMarkerCluster(points(df, [column for _, column, _ in fields]), callback=callback).add_to(map_hooray)
+    return map_hooray
+
+
+class CircleLayer(MacroElement):
+    """
+    Circle markers drawn on a canvas in the browser from a compact array of
+    [latitude, longitude, radius, color index, popup value] rows
+    """
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = (function(){
+            var data = {{ this.data|tojson }};
+            var colors = {{ this.colors|tojson }};
+            var renderer = L.canvas();
+            var layer = L.featureGroup();
+            for (var i = 0; i < data.length; i++) {
+                var row = data[i];
+                L.circleMarker([row[0], row[1]], {radius: row[2], color: colors[row[3]], fill: true,
+                                                  renderer: renderer})
+                    .bindPopup({{ this.label|tojson }} + row[4]).addTo(layer);
+            }
+            layer.addTo({{ this._parent.get_name() }});
+            return layer;
+        })();
+        {% endmacro %}
+        """)
+
+    def __init__(self, df, radius, color, popup, colors, label):
+        super(CircleLayer, self).__init__()
+        self._name = 'CircleLayer'
+        self.data = points(df, [radius, color, popup])
+        self.colors = colors
+        self.label = label
+
+
+class Legend(MacroElement):
+    """
+    Fixed box in the bottom left corner of the map with a colored circle and a label per entry
+    """
+    _template = Template(u"""
+        {% macro html(this, kwargs) %}
+        <div style="position:fixed; bottom:10px; left:10px; border:2px solid black; z-index:9999; font-size:14px;
+                    background-color:white;">
+            &nbsp;<b>{{ this.title }}:</b><br>
+            {% for color, label in this.entries %}
+            &nbsp;<i class="fa fa-circle fa-1x" style="color:{{ color }}"></i>&nbsp;{{ label }}<br>
+            {% endfor %}
+        </div>
+        {% endmacro %}
+        """)
+
+    def __init__(self, title, entries):
+        super(Legend, self).__init__()
+        self._name = 'Legend'
+        self.title = title
+        self.entries = entries
+
+
+def render_map(map_hooray, width=1000, height=600):
+    """
+    Render the map once and show it, every page draws its map through here. The render time and the
+    size of the html sent to the browser are recorded with the page's measurements.
+    """
+    with measure('step', 'render_map'):
+        figure = folium.Figure().add_child(map_hooray)
+        html = figure.render()
+    annotate(map_bytes=len(html.encode()))
+
+    components.html(html, height=height + 10, width=width)
@@ -0,0 +1,267 @@
+import argparse
+import copy
+import hashlib
+import json
+import math
+import time
+from datetime import datetime, timezone
+import numpy as np
+import joblib
+import pandas as pd
+from artifacts import load_artifact
+from cities import CITIES, DEFAULT_CITY, city_directory
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+
+MODEL_VERSION = 2
+
+PARAMS = {'max_depth': 8, 'min_samples_leaf': 0.1, 'min_samples_split': 0.1, 'n_estimators': 50}
+
+# seconds a refresh may spend growing trees and the fewest trees it replaces when any listing changed
+REFRESH_BUDGET = 60.0
+MIN_REFRESH_TREES = 5
+
+
+def data_hash(X, y):
+    """
+    Fingerprint of a training set, index and values included
+    """
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(X, index=True).to_numpy().tobytes())
+    h.update(np.asarray(y, dtype=float).tobytes())
+    h.update(','.join(X.columns).encode())
+    return h.hexdigest()
+
+
+def row_hashes(X, y):
+    """
+    Fingerprint of every training row, features and price, by listing
+    """
+    return pd.Series(pd.util.hash_pandas_object(X.assign(price=np.asarray(y, dtype=float)), index=False).to_numpy(),
+                     index=X.index)
+
+
+def listing_diff(previous, current):
+    """
+    Listings added, removed and changed between two row_hashes() of training sets
+    """
+    common = previous.index.intersection(current.index)
+    changed = common[previous.loc[common].to_numpy() != current.loc[common].to_numpy()]
+    return {'added': current.index.difference(previous.index), 'removed': previous.index.difference(current.index),
+            'changed': changed}
+
+
+def evaluate(model, X, y):
+    y_pred = model.predict(X)
+    return {'mae': float(mean_absolute_error(y, y_pred)), 'r2': float(r2_score(y, y_pred)), 'rows': int(len(y))}
+
+
+def train_price_model(X, y, params=PARAMS, test_size=0.2, random_state=0):
+    """
+    Fit the price model on all cores and return it with the metadata needed to use it safely:
+    feature order, data hash, hyperparameters and the metrics on a held-out split.
+    The returned model is refitted on the whole data set. X is indexed by listing, so that the
+    row_hashes() of the training set let refresh_price_model() find what changed in the next snapshot.
+    """
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    model = RandomForestRegressor(n_jobs=-1, random_state=random_state, **params)
+    model.fit(X_train, y_train)
+    metrics = {'train': evaluate(model, X_train, y_train), 'test': evaluate(model, X_test, y_test)}
+
+    model.fit(X, y)
+    # a single prediction is faster without the thread pool
+    model.set_params(n_jobs=1)
+    return {
+        'model': model,
+        'version': MODEL_VERSION,
+        'features': list(X.columns),
+        'data_hash': data_hash(X, y),
+        'params': dict(params, random_state=random_state),
+        'metrics': metrics,
+        'trained_at': datetime.now(timezone.utc).isoformat(),
+        # number of refreshes since the last full training
+        'generation': 0,
+    }
+
+
+def model_columns(price_model, X):
+    """
+    X with its columns in the model's order when it has the same features. The neighbourhood columns
+    follow the order the neighbourhoods first appear in, which moves between snapshots.
+    """
+    if sorted(X.columns) == sorted(price_model['features']):
+        return X[price_model['features']]
+    return X
+
+
+def grow_trees(model, X, y, trees, time_budget, batch_size=None):
+    """
+    Add up to trees new trees fitted on X, y to the forest in batches, stopping before a batch that would
+    not finish within time_budget seconds. Returns the number of trees grown, at least one batch.
+    """
+    batch_size = batch_size or max(joblib.cpu_count(), 1)
+    model.set_params(warm_start=True, n_jobs=-1)
+    start = time.perf_counter()
+    grown = 0
+    while grown < trees:
+        batch = min(batch_size, trees - grown)
+        elapsed = time.perf_counter() - start
+        if grown and elapsed + elapsed / grown * batch > time_budget:
+            break
+        model.set_params(n_estimators=len(model.estimators_) + batch)
+        model.fit(X, y)
+        grown += batch
+    model.set_params(warm_start=False, n_jobs=1)
+    return grown
+
+
+def refreshable(price_model, X, params):
+    """
+    Whether price_model can be refreshed to X: same model version, features and hyperparameters
+    """
+    return (price_model.get('version') == MODEL_VERSION and sorted(X.columns) == sorted(price_model['features'])
+            and {k: v for k, v in price_model['params'].items() if k != 'random_state'} == dict(params))
+
+
+def refresh_price_model(price_model, rows, X, y, time_budget=REFRESH_BUDGET, min_trees=MIN_REFRESH_TREES,
+                        batch_size=None, diff=None):
+    """
+    Update a price model to a new snapshot of the listings without training it from scratch: the
+    forest replaces a share of its trees equal to the share of listings added, removed or changed
+    since the model was trained (at least min_trees), growing the new trees on the new snapshot and
+    retiring as many of the oldest ones, within time_budget seconds. The features must not have
+    changed, a new amenity vocabulary needs a full training. price_model is left untouched.
+    rows are the row_hashes() of the model's training set, diff defaults to their listing_diff() with X, y.
+    """
+    X = model_columns(price_model, X)
+    check_features(price_model, X)
+    start = time.perf_counter()
+    if diff is None:
+        diff = listing_diff(rows, row_hashes(X, y))
+    churn = sum(len(listings) for listings in diff.values()) / max(len(rows), len(X), 1)
+
+    model = copy.deepcopy(price_model['model'])
+    size = len(model.estimators_)
+    trees = min(size, max(min_trees, math.ceil(size * churn))) if churn else 0
+    generation = price_model['generation'] + 1
+    grown = 0
+    if trees:
+        # new trees of every generation draw different bootstrap samples and features
+        model.set_params(random_state=price_model['params']['random_state'] + generation)
+        grown = grow_trees(model, X, y, trees, time_budget, batch_size)
+        # trees are kept oldest first, retire as many as were grown
+        model.estimators_ = model.estimators_[grown:]
+        model.set_params(n_estimators=len(model.estimators_))
+
+    return dict(price_model, **{
+        'model': model,
+        'data_hash': data_hash(X, y),
+        'metrics': {'train': evaluate(model, X, y)},
+        'trained_at': datetime.now(timezone.utc).isoformat(),
+        'generation': generation,
+        'refresh': {**{name: int(len(listings)) for name, listings in diff.items()}, 'churn': round(churn, 4),
+                    'trees_planned': trees, 'trees_replaced': grown, 'time_budget': time_budget,
+                    'seconds': round(time.perf_counter() - start, 3), 'refreshed_from': price_model['data_hash']},
+    })
+
+
+def refresh_report(price_model, rows, X, y, time_budget=REFRESH_BUDGET, min_trees=MIN_REFRESH_TREES, test_size=0.2,
+                   random_state=0, diff=None):
+    """
+    Compare a refresh of price_model with a full training on the same training split of a new snapshot,
+    scored on the held-out listings that were added or changed since price_model was trained. The trees
+    the refresh keeps were grown on the unchanged ones, so its score on the whole held-out split would be
+    flattered and only the full training is scored on it. Raises ValueError when none of the held-out
+    listings is new. diff defaults to the listing_diff() of rows with X, y.
+    """
+    X = model_columns(price_model, X)
+    if diff is None:
+        diff = listing_diff(rows, row_hashes(X, y))
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    unseen = X_test.index.isin(diff['added'].union(diff['changed']))
+    if not unseen.any():
+        raise ValueError("None of the {} held-out listings was added or changed since the price model was "
+                         "trained".format(len(X_test)))
+
+    start = time.perf_counter()
+    # the trees to replace follow from the whole snapshot, the held-out listings are not removed ones
+    refreshed = refresh_price_model(price_model, rows, X_train, y_train, time_budget, min_trees, diff=diff)
+    refresh_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    full = RandomForestRegressor(n_jobs=-1, random_state=random_state,
+                                 **{name: value for name, value in price_model['params'].items()
+                                    if name != 'random_state'})
+    full.fit(X_train, y_train)
+    full_seconds = time.perf_counter() - start
+
+    return {
+        'rows': {'train': int(len(y_train)), 'test': int(len(y_test)), 'test_new': int(unseen.sum())},
+        'refresh': refreshed['refresh'],
+        'refreshed': {'seconds': round(refresh_seconds, 3),
+                      'test_new': evaluate(refreshed['model'], X_test[unseen], y_test[unseen])},
+        'full': {'seconds': round(full_seconds, 3), 'test_new': evaluate(full, X_test[unseen], y_test[unseen]),
+                 'test': evaluate(full, X_test, y_test)},
+    }
+
+
+def check_features(price_model, X):
+    if price_model['version'] != MODEL_VERSION:
+        raise ValueError("Price model version {} does not match the app version {}, rebuild it with "
+                         "`python save_csv.py --only price_model`".format(price_model['version'], MODEL_VERSION))
+    if list(X.columns) != price_model['features']:
+        missing = sorted(set(price_model['features']) - set(X.columns))
+        unexpected = sorted(set(X.columns) - set(price_model['features']))
+        raise ValueError("Features do not match the ones the price model was trained on "
+                         "(missing: {}, unexpected: {}, or a different order)".format(missing, unexpected))
+
+
+def predict_price(price_model, X):
+    check_features(price_model, X)
+    return price_model['model'].predict(X)
+
+
+def by_listing(df_predictions, df_listings):
+    """
+    Features and prices the price model is trained on, indexed by listing id so that snapshots can be compared
+    """
+    ids = pd.Index(df_listings['id_listings'].loc[df_predictions.index], name='id_listings')
+    return df_predictions.set_axis(ids, axis=0), df_listings['price'].loc[df_predictions.index].set_axis(ids)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=(
+        "Compare a refresh of the built price model of a city with a full training on the listings of a new "
+        "snapshot, without changing any artifact. The model and its model_rows must still be those of the previous "
+        "snapshot: put the new raw listings in place, build everything the model is trained on with "
+        "`python save_csv.py --only clean --only listings --only predictions`, run this, then refresh the model "
+        "with `python save_csv.py --refresh-model SECONDS`."))
+    parser.add_argument('--city', choices=list(CITIES), default=DEFAULT_CITY)
+    parser.add_argument('--time-budget', type=float, default=REFRESH_BUDGET, help="seconds spent growing trees")
+    parser.add_argument('--min-trees', type=int, default=MIN_REFRESH_TREES,
+                        help="fewest trees replaced when any listing changed")
+    parser.add_argument('--report', metavar='PATH', help="also write the comparison as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    directory = city_directory(args.city)
+    X, y = by_listing(load_artifact('df_predictions', directory),
+                      load_artifact('df_listings', directory, columns=['id_listings', 'price']))
+    price_model = load_artifact('price_model', directory)
+    rows = load_artifact('model_rows', directory)['hash']
+    if not refreshable(price_model, X, PARAMS):
+        parser.error("the features or hyperparameters of the price model changed, it can only be trained again")
+    diff = listing_diff(rows, row_hashes(model_columns(price_model, X), y))
+    if not any(len(listings) for listings in diff.values()):
+        parser.error("no listing was added, removed or changed since the price model was trained, build the new "
+                     "snapshot without the model first with "
+                     "`python save_csv.py --only clean --only listings --only predictions`")
+    report = refresh_report(price_model, rows, X, y, args.time_budget, args.min_trees, diff=diff)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import re
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from instrumentation import measure
+from cities import CITIES, build_overrides, city_directory
+from artifacts import ARTIFACTS_DIR, SCHEMAS, artifact_path, iter_artifact, load_artifact, save_artifact, save_chunks
+
+MANIFEST = 'manifest.json'
+
+# params that change how a stage runs but not what it produces, they are left out of the stage key.
+# refresh_budget updates the price model of the last build instead of training it again.
+EXECUTION_PARAMS = ('chunksize', 'refresh_budget')
+
+STAGES = []
+
+# messages reported with note() by the stage running in this process
+_notes = []
+
+
+class Stage:
+    """
+    A named build step. sources are raw files passed to the function as paths, inputs are
+    artifacts of earlier stages passed as loaded objects, params are passed as keyword arguments.
+    overrides replace the sources and params of the same name, e.g. the raw files of another city.
+    Inputs listed in chunked are passed as an iterator of DataFrames of the chunksize param instead.
+    With previous, the outputs of the last build of the stage are passed as a previous dict (empty
+    when it has not run yet), e.g. to update a model instead of fitting it again.
+    The function returns its outputs in the order they are declared, a generator of DataFrames
+    is written chunk by chunk.
+    """
+
+    def __init__(self, name, func, sources, inputs, outputs, params, chunked, previous=False):
+        self.name = name
+        self.func = func
+        self.sources = sources
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params
+        self.chunked = chunked
+        self.previous = previous
+
+    def resolve(self, overrides=None):
+        """
+        sources and params of the stage with the overrides applied
+        """
+        overrides = overrides or {}
+        sources = {k: overrides.get(k, v) for k, v in self.sources.items()}
+        params = {k: overrides.get(k, v) for k, v in self.params.items()}
+        return sources, params
+
+    def key(self, directory, overrides=None):
+        """
+        Hash of everything the outputs depend on: the stage code, its params, the schema of its outputs
+        and the content of its sources and inputs
+        """
+        sources, params = self.resolve(overrides)
+        h = hashlib.sha256()
+        h.update(code_hash(self.func).encode())
+        params = {k: v for k, v in params.items() if k not in EXECUTION_PARAMS}
+        h.update(json.dumps(params, sort_keys=True, default=str).encode())
+        # the outputs are stored with their schema, a new dtype means rewriting them
+        h.update(json.dumps([SCHEMAS.get(name) for name in self.outputs], sort_keys=True).encode())
+        for arg, path in sorted(sources.items()):
+            h.update(arg.encode())
+            h.update(file_hash(path).encode())
+        for name in self.inputs:
+            h.update(name.encode())
+            h.update(file_hash(artifact_path(name, directory)).encode())
+        return h.hexdigest()
+
+    def run(self, directory, overrides=None):
+        sources, params = self.resolve(overrides)
+
+        kwargs = dict(sources)
+        for name in self.inputs:
+            if name in self.chunked:
+                kwargs[name] = iter_artifact(name, directory, params.get('chunksize'))
+            else:
+                kwargs[name] = load_artifact(name, directory)
+        kwargs.update(params)
+        if self.previous:
+            kwargs['previous'] = {name: load_artifact(name, directory) for name in self.outputs
+                                  if os.path.exists(artifact_path(name, directory))}
+
+        results = self.func(**kwargs)
+        if len(self.outputs) == 1:
+            results = (results,)
+        for name, result in zip(self.outputs, results):
+            if isinstance(result, types.GeneratorType):
+                save_chunks(result, name, directory)
+            else:
+                save_artifact(result, name, directory)
+
+
+def stage(name, sources=None, inputs=(), outputs=(), params=None, chunked=(), previous=False):
+    """
+    Register the decorated function as a pipeline stage, stages run in registration order
+    """
+    def register(func):
+        STAGES.append(Stage(name, func, sources or {}, list(inputs), list(outputs), params or {}, list(chunked),
+                            previous))
+        return func
+    return register
+
+
+def code_hash(func, seen=None):
+    """
+    Hash of the source and default arguments of func, of the project functions and classes it uses and of
+    the constants it reads (e.g. RAW_COLUMNS), directly or through those functions
+    """
+    seen = seen if seen is not None else set()
+    seen.add(func)
+    h = hashlib.sha256(inspect.getsource(func).encode())
+    defaults = list(func.__defaults__ or ()) + list((func.__kwdefaults__ or {}).items())
+    h.update(str([value_repr(value) for value in defaults]).encode())
+    for name in code_names(func.__code__):
+        if name not in func.__globals__:
+            continue
+        helper = func.__globals__[name]
+        if inspect.isfunction(helper):
+            if helper not in seen and is_project_code(helper):
+                h.update(code_hash(helper, seen).encode())
+        elif inspect.isclass(helper):
+            if helper not in seen and is_project_code(helper):
+                seen.add(helper)
+                h.update(inspect.getsource(helper).encode())
+        else:
+            value = value_repr(helper)
+            if value is not None:
+                h.update(name.encode())
+                h.update(value.encode())
+    return h.hexdigest()
+
+
+def value_repr(value):
+    """
+    Text that is the same in every process for plain constants (numbers, strings, types, regular expressions
+    and containers of them), None for anything else such as modules or objects
+    """
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return repr(value)
+    if isinstance(value, type):
+        return value.__module__ + '.' + value.__qualname__
+    if isinstance(value, re.Pattern):
+        return 're.compile({!r}, {})'.format(value.pattern, value.flags)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [value_repr(item) for item in value]
+        if None in items:
+            return None
+        if isinstance(value, (set, frozenset)):
+            items = sorted(items)
+        return type(value).__name__ + '(' + ', '.join(items) + ')'
+    if isinstance(value, dict):
+        items = [(value_repr(k), value_repr(v)) for k, v in value.items()]
+        if any(k is None or v is None for k, v in items):
+            return None
+        return '{' + ', '.join(k + ': ' + v for k, v in items) + '}'
+    return None
+
+
+def code_names(code):
+    """
+    Global names used by a code object, including the ones of nested comprehensions and lambdas
+    """
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names.extend(code_names(const))
+    return names
+
+
+def is_project_code(func):
+    path = inspect.getsourcefile(func) or ''
+    return os.path.dirname(os.path.abspath(path)) == os.path.dirname(os.path.abspath(__file__))
+
+
+def file_hash(path):
+    if not os.path.exists(path):
+        return ''
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(directory):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def note(message):
+    """
+    Report something about the current run of a stage, e.g. why a model was trained from scratch, in
+    its row of the summary instead of printing it among the output of the cities built in parallel
+    """
+    _notes.append(message)
+
+
+def save_manifest(manifest, directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def run(force=False, only=None, directory=ARTIFACTS_DIR, overrides=None):
+    """
+    Run the stages whose outputs are missing or whose key changed since they were built.
+    With only, the other stages are left untouched even if they are stale.
+    overrides replace the sources and params of the same name in every stage that declares them.
+    Returns a (stage, status, seconds) row per stage, the status of a stage that ran is 'ran' followed
+    by the messages it reported with note(), separated by '; '.
+    """
+    unknown = set(only or []) - {s.name for s in STAGES}
+    if unknown:
+        raise ValueError("Unknown stage(s): " + ", ".join(sorted(unknown)))
+
+    manifest = load_manifest(directory)
+    summary = []
+    for s in STAGES:
+        key = s.key(directory, overrides)
+        built = manifest.get(s.name, {})
+        fresh = built.get('key') == key and all(os.path.exists(artifact_path(name, directory)) for name in s.outputs)
+
+        if only and s.name not in only:
+            summary.append((s.name, 'up to date' if fresh else 'stale, skipped', 0.0))
+            continue
+        if fresh and not force:
+            summary.append((s.name, 'up to date', 0.0))
+            continue
+
+        del _notes[:]
+        start = time.perf_counter()
+        with measure('stage', s.name):
+            s.run(directory, overrides)
+        seconds = time.perf_counter() - start
+
+        manifest[s.name] = {'key': key, 'outputs': s.outputs, 'seconds': round(seconds, 3)}
+        save_manifest(manifest, directory)
+        summary.append((s.name, '; '.join(['ran'] + _notes), seconds))
+    return summary
+
+
+def print_summary(summary):
+    width = max(len(name) for name, _, _ in summary)
+    for name, status, seconds in summary:
+        status, _, notes = status.partition('; ')
+        line = name.ljust(width) + '  ' + status.ljust(15)
+        if status == 'ran':
+            line += '  {:.2f}s'.format(seconds)
+        if notes:
+            line += '  ' + notes
+        print(line)
+    print('total'.ljust(width) + '  ' + ''.ljust(15) + '  {:.2f}s'.format(sum(s for _, _, s in summary)))
+
+
+def build_city(city, force=False, only=None, chunksize=None, refresh_budget=None):
+    """
+    Run the stages for one city into its own artifact directory, returns the city and its summary
+    """
+    overrides = dict(build_overrides(city), chunksize=chunksize, refresh_budget=refresh_budget)
+    return city, run(force=force, only=only, directory=city_directory(city), overrides=overrides)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the artifacts used by the app")
+    parser.add_argument('--force', action='store_true', help="rebuild the selected stages even if they are up to date")
+    parser.add_argument('--only', action='append', metavar='STAGE', choices=[s.name for s in STAGES],
+                        help="run only this stage (can be repeated)")
+    parser.add_argument('--chunksize', type=int, metavar='ROWS',
+                        help="stream the raw listings in chunks of this many rows to bound memory")
+    parser.add_argument('--city', action='append', choices=list(CITIES),
+                        help="build only this city (can be repeated), all of them by default")
+    parser.add_argument('--refresh-model', type=float, metavar='SECONDS', dest='refresh_budget',
+                        help="update the price model of the last build to new listings within this many seconds "
+                             "instead of training it again, when its features and hyperparameters are unchanged")
+    parser.add_argument('--jobs', type=int,
+                        help="number of cities built in parallel processes, one per city up to the number of CPUs by default")
+    args = parser.parse_args(argv)
+
+    cities = args.city or list(CITIES)
+    jobs = args.jobs or min(len(cities), os.cpu_count() or 1)
+    if jobs == 1:
+        results = [build_city(city, args.force, args.only, args.chunksize, args.refresh_budget) for city in cities]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(build_city, cities, repeat(args.force), repeat(args.only), repeat(args.chunksize),
+                                    repeat(args.refresh_budget)))
+
+    for city, summary in results:
+        if len(results) > 1:
+            print(CITIES[city]['name'])
+        print_summary(summary)
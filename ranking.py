@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+
+class Rankings:
+    """
+    Row positions of a frame presorted by each ranking column, overall and per group.
+    Sort keys are stored so that ascending order is always the wanted one (descending columns
+    are negated) and missing values come last, like DataFrame.sort_values.
+    """
+
+    def __init__(self, df, ascending, by='neighbourhood'):
+        self.size = len(df)
+        self.keys = {}
+        self.order = {}
+        self.group_order = {}
+
+        groups, names = pd.factorize(df[by])
+        for column, asc in ascending.items():
+            values = df[column].to_numpy(dtype=float)
+            key = values if asc else -values
+            self.keys[column] = key
+            self.order[column] = np.argsort(key, kind='stable')
+
+            # rows grouped by neighbourhood, sorted by the column inside every group
+            grouped = np.lexsort((key, groups))
+            bounds = np.searchsorted(groups[grouped], np.arange(len(names) + 1))
+            for i, name in enumerate(names):
+                self.group_order.setdefault(name, {})[column] = grouped[bounds[i]:bounds[i + 1]]
+
+    def top_n(self, columns, n, positions=None, group=None):
+        """
+        Positions of the n first rows of the group, or of the given row positions, ordered by
+        columns in order of priority. Only the rows tied with the n-th one on the first
+        column are fully sorted.
+        """
+        first = columns[0]
+        if n <= 0:
+            return np.array([], dtype=int)
+        if group is not None:
+            order = self.group_order.get(group, {}).get(first, np.array([], dtype=int))
+        elif positions is None:
+            order = self.order[first]
+        elif len(positions) * 8 < self.size:
+            # a small subset is cheaper to sort directly than to pick out of the overall order
+            return self.sort(np.asarray(positions), columns)[:n]
+        else:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[positions] = True
+            order = self.order[first][mask[self.order[first]]]
+
+        if len(order) <= n:
+            return self.sort(order, columns)[:n]
+        return self.sort(order[:n + self.ties(order, n, first)], columns)[:n]
+
+    def ties(self, order, n, column):
+        """
+        Number of rows after the n-th one of order that have the same value in column
+        """
+        key = self.keys[column]
+        last = key[order[n - 1]]
+        count, block = 0, 64
+        while n + count < len(order):
+            following = key[order[n + count:n + count + block]]
+            same = np.isnan(following) if np.isnan(last) else following == last
+            if not same.all():
+                return count + int(np.argmin(same))
+            count += len(following)
+            block *= 2
+        return count
+
+    def sort(self, positions, columns):
+        """
+        positions sorted by columns in order of priority, ties keep the frame order
+        """
+        keys = [positions] + [self.keys[column][positions] for column in reversed(columns)]
+        return positions[np.lexsort(keys)]
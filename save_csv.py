@@ -1,151 +1,178 @@
 import pandas as pd
-from math import radians, cos, sin, asin, sqrt
 import re
 import numpy as np
-
-def haversine(df_attractions, lat2, lon2):
-    """
-    Calculate the great circle distance between two points
-    on the earth (specified in decimal degrees)
-    """
-    lat1 = df_attractions.latitude.mean()
-    lon1 = df_attractions.longitude.mean()
-
-    # convert decimal degrees to radians
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-
-    # haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-    c = 2 * asin(sqrt(a))
-    r = 6371  # Radius of earth in kilometers. Use 3956 for miles
-    return c * r
-
-
-df_listings = pd.read_csv("new_york.csv", index_col='Unnamed: 0')
-df_attractions = pd.read_csv("attractions.csv", index_col='Unnamed: 0')
-
-# remove special characters from price column and listings with NaN value
-df_listings = df_listings.dropna(subset=['price'])
-df_listings['price'] = df_listings.price.replace(to_replace='[a-zA-Z]', value='', regex=True)
-df_listings['price'] = df_listings.price.replace(to_replace=',|\$', value='', regex=True)
-df_listings['price'] = pd.to_numeric(df_listings['price'], errors='coerce')
-df_listings = df_listings[df_listings['price'] > 0]
-
-# remove special characters from rating column and listings with NaN value
-df_listings = df_listings.dropna(subset=['review_scores_rating'])
-df_listings['review_scores_rating'] = df_listings.review_scores_rating.replace(to_replace='[a-zA-Z]', value='',
-                                                                               regex=True)
-df_listings['review_scores_rating'] = df_listings.review_scores_rating.replace(to_replace='\s\s+', value='',
+from geo import HEATMAP_CELLS, attraction_features, density_pyramid, neighbourhood_gazetteer
+from histograms import grouped_histograms, round_up
+from amenities import encode_amenities, fit_vocabulary, split_amenities
+from model import PARAMS, by_listing, refresh_price_model, refreshable, row_hashes, train_price_model
+from clusters import CLUSTER_COUNTS, cluster_shapes, cluster_table
+from figures import statistics_figures
+from artifacts import CLUST_SCHEMA
+from pipeline import note, stage, main
+
+# columns of the raw Inside-Airbnb export used by the app, the rest is never read
+RAW_COLUMNS = ['Unnamed: 0', 'id_listings', 'neighbourhood', 'latitude', 'longitude', 'price', 'review_scores_rating',
+               'host_response_rate', 'reviews_per_month', 'amenities', 'zipcode']
+RAW_DTYPES = {'neighbourhood': str, 'price': str, 'host_response_rate': str, 'amenities': str, 'zipcode': str}
+
+
+@stage('clean', sources={'raw_path': 'new_york.csv'}, outputs=['listings_clean'], params={'chunksize': None})
+def clean(raw_path, chunksize):
+    reader = pd.read_csv(raw_path, index_col='Unnamed: 0', usecols=RAW_COLUMNS, dtype=RAW_DTYPES,
+                         chunksize=chunksize)
+    if chunksize is None:
+        return clean_listings(reader)
+    return (clean_listings(chunk) for chunk in reader)
+
+
+def clean_listings(df_listings):
+    # remove special characters from price column and listings with NaN value
+    df_listings = df_listings.dropna(subset=['price'])
+    df_listings['price'] = df_listings.price.replace(to_replace='[a-zA-Z]', value='', regex=True)
+    df_listings['price'] = df_listings.price.replace(to_replace=',|\$', value='', regex=True)
+    df_listings['price'] = pd.to_numeric(df_listings['price'], errors='coerce')
+    df_listings = df_listings[df_listings['price'] > 0]
+
+    # remove special characters from rating column and listings with NaN value
+    df_listings = df_listings.dropna(subset=['review_scores_rating'])
+    df_listings['review_scores_rating'] = df_listings.review_scores_rating.replace(to_replace='[a-zA-Z]', value='',
+                                                                                   regex=True)
+    df_listings['review_scores_rating'] = df_listings.review_scores_rating.replace(to_replace='\s\s+', value='',
+                                                                                   regex=True)
+    df_listings['review_scores_rating'] = pd.to_numeric(df_listings['review_scores_rating'], errors='coerce')
+    df_listings = df_listings[df_listings['review_scores_rating'] > 0]
+
+    # remove listings with NaN value at neighbourhood column
+    df_listings = df_listings.dropna(subset=['neighbourhood'])
+
+    # remove special characters from host_response_rate and listings with NaN value
+    df_listings = df_listings.dropna(subset=['host_response_rate'])
+    df_listings['host_response_rate'] = df_listings.host_response_rate.replace(to_replace='%', value='',
                                                                                regex=True)
-df_listings['review_scores_rating'] = pd.to_numeric(df_listings['review_scores_rating'], errors='coerce')
-df_listings = df_listings[df_listings['review_scores_rating'] > 0]
+    df_listings['host_response_rate'] = pd.to_numeric(df_listings['host_response_rate'], errors='coerce')
+    df_listings = df_listings[df_listings['host_response_rate'] > 0]
+
+    return df_listings
+
+
+@stage('attractions', sources={'attractions_path': 'attractions.csv'}, outputs=['df_attractions'])
+def attractions(attractions_path):
+    return pd.read_csv(attractions_path, index_col='Unnamed: 0')
+
+
+@stage('listings', inputs=['listings_clean', 'df_attractions'], outputs=['df_listings'],
+       params={'chunksize': None}, chunked=['listings_clean'])
+def listings(listings_clean, df_attractions, chunksize):
+    # written chunk by chunk, load_artifact sorts the listings by distance (see ORDERS)
+    return (listing_features(chunk, df_attractions) for chunk in listings_clean)
+
+
+def listing_features(df_listings, df_attractions):
+    ################################ count haversine distance from aver attractions #################
+    df_listings = df_listings.join(attraction_features(df_listings, df_attractions))
+
+    ###################### round prices, ratings and amenities #############################
+    df_listings = df_listings.assign(round_price=round_up(df_listings['price'], 100))
+    df_listings = df_listings.assign(round_rating=round_up(df_listings['review_scores_rating'], 5))
+
+    df_listings['amenities'] = pd.Series(split_amenities(df_listings['amenities']), index=df_listings.index)
+    df_listings['count_amenities'] = df_listings['amenities'].str.len()
+    df_listings = df_listings.assign(round_amenities=round_up(df_listings['count_amenities'], 5))
+
+    return df_listings
+
+
+@stage('distributions', inputs=['df_listings'],
+       outputs=['df_count', 'df_neigh_price', 'df_neigh_rating', 'df_neigh_amenities', 'focus_neighbourhoods'])
+def distributions(df_listings):
+    neighs = df_listings['neighbourhood'].unique()
+    focus_neighs = np.append(neighs[:20], neighs[-20:])
+
+    #### listings distribution
+    df_count = df_listings[df_listings.neighbourhood.isin(focus_neighs)].groupby('neighbourhood', observed=True).count()[
+        'id_listings'].reset_index(name='count')
+    df_count['neigh_cat'] = pd.Categorical(df_count['neighbourhood'], categories=focus_neighs, ordered=True)
+    df_count = df_count.sort_values(['neigh_cat'])
+
+    ##### Price, ratings and amenities distributions
+    histograms = grouped_histograms(df_listings, {'round_price': ('price', 100),
+                                                  'round_rating': ('review_scores_rating', 5),
+                                                  'round_amenities': ('count_amenities', 5)})
+    df_neigh_price = histograms['round_price']
+    df_neigh_rating = histograms['round_rating']
+    df_neigh_amenities = histograms['round_amenities']
+
+    return df_count, df_neigh_price, df_neigh_rating, df_neigh_amenities, pd.DataFrame({'neighbourhood': focus_neighs})
+
+
+@stage('statistics_figures',
+       inputs=['df_count', 'df_neigh_price', 'df_neigh_rating', 'df_neigh_amenities', 'focus_neighbourhoods'],
+       outputs=['statistics_figures'])
+def figures(df_count, df_neigh_price, df_neigh_rating, df_neigh_amenities, focus_neighbourhoods):
+    return statistics_figures(df_count, df_neigh_price, df_neigh_rating, df_neigh_amenities,
+                              focus_neighbourhoods['neighbourhood'].tolist())
+
+
+@stage('predictions', inputs=['df_listings'], outputs=['df_predictions', 'facilities'], params={'min_count': 1090})
+def predictions(df_listings, min_count):
+    ## dataframe for prediction
+    facilities = fit_vocabulary(df_listings.amenities, min_count)
+    # only the frequent amenities are expanded to dense columns
+    df_predictions = pd.DataFrame(encode_amenities(df_listings.amenities, facilities).toarray(),
+                                  index=df_listings.index, columns=facilities)
+    df_predictions = df_predictions.assign(neighbourhood=df_listings['neighbourhood'])
+    df_predictions = df_predictions.assign(distance=df_listings['distance'])
+    df_predictions = pd.get_dummies(df_predictions, columns=['neighbourhood'], prefix='', prefix_sep='')
+
+    return df_predictions, pd.DataFrame({'facility': facilities})
+
+
+@stage('price_model', inputs=['df_predictions', 'df_listings'], outputs=['price_model', 'model_rows'],
+       params={'hyperparameters': PARAMS, 'refresh_budget': None}, previous=True)
+def price_model(df_predictions, df_listings, hyperparameters, refresh_budget, previous):
+    X, y = by_listing(df_predictions, df_listings)
+    rows = row_hashes(X, y).to_frame('hash')
+    if (refresh_budget is not None and 'model_rows' in previous
+            and refreshable(previous['price_model'], X, hyperparameters)):
+        refreshed = refresh_price_model(previous['price_model'], previous['model_rows']['hash'], X, y, refresh_budget)
+        note("refreshed, {trees_replaced} trees replaced for a churn of {churn}".format(**refreshed['refresh']))
+        return refreshed, rows
+    if refresh_budget is not None:
+        note("trained from scratch, no model with the same features and hyperparameters to refresh")
+    return train_price_model(X, y, hyperparameters), rows
+
+
+@stage('gazetteer', inputs=['df_listings'], outputs=['gazetteer'])
+def gazetteer(df_listings):
+    return neighbourhood_gazetteer(df_listings)
+
+
+@stage('heatmap', inputs=['df_listings'], outputs=['heatmap'], params={'cells': HEATMAP_CELLS})
+def heatmap(df_listings, cells):
+    return density_pyramid(df_listings, cells)
+
+
+@stage('clustering', inputs=['df_listings'], outputs=['df_clust'])
+def clustering(df_listings):
+    # dataframe for clustering
+    df_clust = df_listings.copy()
+    df_clust = df_clust.dropna(subset=['zipcode'])
+    df_clust.zipcode = df_clust.zipcode.apply(lambda x: int(re.findall('([0-9.]+)', str(x))[0]))
+    df_clust = df_clust.assign(price=np.ceil(df_clust['price'] / 50.0) * 50)
+
+    return df_clust[list(CLUST_SCHEMA)]
+
+
+@stage('price_clusters', inputs=['df_clust'], outputs=['df_cluster_labels', 'df_cluster_stats'],
+       params={'counts': CLUSTER_COUNTS, 'random_state': 0})
+def price_clusters(df_clust, counts, random_state):
+    return cluster_table(df_clust, counts, random_state)
+
+
+@stage('cluster_shapes', inputs=['df_clust', 'df_cluster_labels', 'df_cluster_stats'], outputs=['cluster_shapes'])
+def shapes(df_clust, df_cluster_labels, df_cluster_stats):
+    return cluster_shapes(df_clust, df_cluster_labels, df_cluster_stats)
+
 
-# remove listings with NaN value at neighbourhood column
-df_listings = df_listings.dropna(subset=['neighbourhood'])
-
-# remove special characters from host_response_rate and listings with NaN value
-df_listings = df_listings.dropna(subset=['host_response_rate'])
-df_listings['host_response_rate'] = df_listings.host_response_rate.replace(to_replace='%', value='',
-                                                                       regex=True)
-df_listings['host_response_rate'] = pd.to_numeric(df_listings['host_response_rate'], errors='coerce')
-df_listings = df_listings[df_listings['host_response_rate'] > 0]
-
-
-################################ count haversine distance from aver attractions #################
-df_listings['distance'] = df_listings.apply(lambda x: haversine(df_attractions, x['latitude'], x['longitude']),
-                                            axis=1)
-df_listings = df_listings.sort_values(by='distance')
-
-neighs = df_listings['neighbourhood'].unique()
-focus_neighs = np.append(neighs[:20], neighs[-20:])
-
-#### listings distribution
-df_count = df_listings[df_listings.neighbourhood.isin(focus_neighs)].groupby('neighbourhood').count()[
-    'id_listings'].reset_index(name='count')
-df_count['neigh_cat'] = pd.Categorical(df_count['neighbourhood'], categories=focus_neighs, ordered=True)
-df_count = df_count.sort_values(['neigh_cat'])
-
-##### Price distribution
-df_listings = df_listings.assign(round_price=np.ceil(df_listings['price'] / 100.0) * 100)
-df_neigh_price = pd.DataFrame()
-
-for neigh in df_listings.neighbourhood.unique():
-    price_per_neigh = df_listings[df_listings['neighbourhood'] == neigh].groupby('round_price').count()[
-        'id_listings']
-    total_listings = df_listings[df_listings['neighbourhood'] == neigh].count()['id_listings']
-    df_neigh_price[neigh] = price_per_neigh / total_listings
-
-df_neigh_price.reset_index(inplace=True)
-df_neigh_price['round_price'] = df_neigh_price['round_price'].astype(int)
-df_neigh_price['round_price'] = df_neigh_price['round_price'].astype(str)
-
-#### Ratings distribution
-df_listings = df_listings.assign(round_rating=np.ceil(df_listings['review_scores_rating'] / 5.0) * 5)
-
-df_neigh_rating = pd.DataFrame()
-
-for neigh in df_listings.neighbourhood.unique():
-    rating_per_neigh = df_listings[df_listings['neighbourhood'] == neigh].groupby('round_rating').count()[
-        'id_listings']
-    total_listings = df_listings[df_listings['neighbourhood'] == neigh].count()['id_listings']
-    df_neigh_rating[neigh] = rating_per_neigh / total_listings
-
-df_neigh_rating.reset_index(inplace=True)
-df_neigh_rating['round_rating'] = df_neigh_rating['round_rating'].astype(int)
-df_neigh_rating['round_rating'] = df_neigh_rating['round_rating'].astype(str)
-
-
-##################################  for amenities ##################################################
-df_listings['count_amenities'] = df_listings.apply(lambda x: len(x['amenities'].split(',')), axis=1)
-df_listings['amenities'] = df_listings.apply(lambda x: x['amenities'].split(','), axis=1)
-regex = re.compile('[^a-zA-Z\d\s]')
-df_listings.amenities = df_listings.amenities.apply(lambda x: [regex.sub('', it) for it in x])
-df_predictions = pd.get_dummies(df_listings.amenities.apply(pd.Series).stack()).sum(level=0)
-
-
-##### Amenities distribution
-df_listings = df_listings.assign(round_amenities=np.ceil(df_listings['count_amenities'] / 5.0) * 5)
-
-df_neigh_amenities = pd.DataFrame()
-
-for neigh in df_listings.neighbourhood.unique():
-    amenities_per_neigh = df_listings[df_listings['neighbourhood'] == neigh].groupby('round_amenities').count()[
-        'id_listings']
-    total_listings = df_listings[df_listings['neighbourhood'] == neigh].count()['id_listings']
-    df_neigh_amenities[neigh] = amenities_per_neigh / total_listings
-
-df_neigh_amenities.reset_index(inplace=True)
-df_neigh_amenities['round_amenities'] = df_neigh_amenities['round_amenities'].astype(int)
-df_neigh_amenities['round_amenities'] = df_neigh_amenities['round_amenities'].astype(str)
-
-
-## dataframe for prediction
-k = df_predictions.sum(axis=0, skipna=True)
-filt_amnities = k[k.values >= 1090].index.tolist()
-df_predictions = df_predictions.loc[:, df_predictions.columns.isin(filt_amnities)]
-
-df_predictions = df_predictions.drop(
-    columns=['translation missing enhostingamenity49', 'translation missing enhostingamenity50'])
-facilities = df_predictions.columns.to_list()
-df_predictions = df_predictions.assign(neighbourhood=df_listings['neighbourhood'])
-df_predictions = df_predictions.assign(distance=df_listings['distance'])
-df_predictions = pd.get_dummies(df_predictions, columns=['neighbourhood'], prefix='', prefix_sep='')
-
-# dataframe for clustering
-df_clust = df_listings.copy()
-df_clust = df_clust.dropna(subset=['zipcode'])
-df_clust.zipcode = df_clust.zipcode.apply(lambda x: int(re.findall('([0-9.]+)', str(x))[0]))
-df_clust = df_clust.assign(price=np.ceil(df_clust['price'] / 50.0) * 50)
-
-# save csv files
-df_listings.to_csv('csv_files/df_listings.csv')
-df_attractions.to_csv('csv_files/df_attractions.csv')
-df_count.to_csv('csv_files/df_count.csv')
-df_neigh_price.to_csv('csv_files/df_neigh_price.csv')
-df_neigh_rating.to_csv('csv_files/df_neigh_rating.csv')
-df_neigh_amenities.to_csv('csv_files/df_neigh_amenities.csv')
-df_predictions.to_csv('csv_files/df_predictions.csv')
-df_clust.to_csv('csv_files/df_clust.csv')
-pd.DataFrame(facilities).to_csv('csv_files/facilities.csv')
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from histograms import round_up
+
+# histograms kept per store, one per (neighbourhood, price range, column, bin width) selection
+HISTOGRAM_CACHE = 1024
+
+
+def read_only(values):
+    """
+    View of the array that raises on any attempt to write to it
+    """
+    view = np.asarray(values).view()
+    view.flags.writeable = False
+    return view
+
+
+class ListingStore:
+    """
+    Read-only columns of the listings, shared by every session, with the row positions of every
+    neighbourhood ordered by price bin so that a price range is a slice of them. Pages select row
+    positions and build frames of the selected rows only, the listings are never copied or modified.
+    """
+
+    def __init__(self, df, price_bin=50):
+        self.size = len(df)
+        self.price_bin = price_bin
+        self.columns = {column: read_only(df[column].to_numpy()) for column in df.columns}
+        self.columns['round_price'] = read_only(round_up(df['price'], price_bin))
+
+        groups, names = pd.factorize(df['neighbourhood'])
+        self.neighbourhoods = list(names)
+        # positions grouped by neighbourhood and sorted by price bin inside every group, ties keep the frame order
+        order = np.lexsort((self.columns['round_price'], groups))
+        bounds = np.searchsorted(groups[order], np.arange(len(names) + 1))
+        self.positions = {}
+        self.bins = {}
+        for i, name in enumerate(names):
+            positions = order[bounds[i]:bounds[i + 1]]
+            self.positions[name] = read_only(positions)
+            self.bins[name] = read_only(self.columns['round_price'][positions])
+
+        self.histogram = lru_cache(maxsize=HISTOGRAM_CACHE)(self._histogram)
+
+    def select(self, neighbourhood, minimum=-np.inf, maximum=np.inf):
+        """
+        Positions of the listings of the neighbourhood whose price bin is within [minimum, maximum],
+        ordered by price bin. The result is a view, nothing is allocated.
+        """
+        positions = self.positions.get(neighbourhood, read_only(np.array([], dtype=np.int64)))
+        bins = self.bins.get(neighbourhood, read_only(np.array([])))
+        start = np.searchsorted(bins, minimum, side='left')
+        stop = np.searchsorted(bins, maximum, side='right')
+        return positions[start:stop]
+
+    def _histogram(self, neighbourhood, minimum, maximum, column, width):
+        """
+        (bin upper edges, counts) of column over the listings selected like select(), for bins with
+        at least one listing. Memoized per store by histogram(), the arrays are read-only.
+        """
+        positions = self.select(neighbourhood, minimum, maximum)
+        if column == 'price' and width == self.price_bin:
+            # the selection is already sorted by price bin
+            bins = self.columns['round_price'][positions]
+        else:
+            bins = np.sort(round_up(self.columns[column][positions], width))
+            bins = bins[~np.isnan(bins)]
+        edges, counts = np.unique(bins, return_counts=True)
+        return read_only(edges), read_only(counts)
+
+    def frame(self, positions, columns):
+        """
+        New frame with the given columns of the listings at positions
+        """
+        return pd.DataFrame({column: self.columns[column][positions] for column in columns})
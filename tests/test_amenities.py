@@ -0,0 +1,57 @@
+import re
+import numpy as np
+import pandas as pd
+import pytest
+from amenities import MISSING, encode_amenities, encode_raw_amenities, fit_vocabulary, split_amenities
+
+NAMES = ['TV', '"Cable TV"', 'Wifi', 'Kitchen', '"Air conditioning"', '"Hair dryer"', 'Iron', 'Heating',
+         '"translation missing: en.hosting_amenity_49"', '"translation missing: en.hosting_amenity_50"']
+
+
+def raw_amenities(rng, rows):
+    """
+    Raw '{TV,"Cable TV",...}' strings of the Inside-Airbnb export, every amenity listed at most once
+    """
+    return ['{' + ','.join(rng.choice(NAMES, rng.randint(1, len(NAMES) + 1), replace=False)) + '}'
+            for _ in range(rows)]
+
+
+def expected(raw, min_count):
+    """
+    The predictions stage's former get_dummies encoding, with the placeholders dropped by prefix
+    """
+    df_listings = pd.DataFrame({'amenities': raw})
+    df_listings['amenities'] = df_listings.apply(lambda x: x['amenities'].split(','), axis=1)
+    regex = re.compile(r'[^a-zA-Z\d\s]')
+    df_listings.amenities = df_listings.amenities.apply(lambda x: [regex.sub('', it) for it in x])
+    df_predictions = pd.get_dummies(df_listings.amenities.apply(pd.Series).stack()).groupby(level=0).sum()
+
+    k = df_predictions.sum(axis=0, skipna=True)
+    filt_amnities = k[k.values >= min_count].index.tolist()
+    df_predictions = df_predictions.loc[:, df_predictions.columns.isin(filt_amnities)]
+    return df_predictions.loc[:, ~df_predictions.columns.str.startswith(MISSING)]
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_encoding_matches_get_dummies(seed):
+    rng = np.random.RandomState(seed)
+    raw = raw_amenities(rng, rng.randint(1, 200))
+    min_count = rng.randint(1, 60)
+    df_predictions = expected(raw, min_count)
+
+    amenities = split_amenities(raw)
+    vocabulary = fit_vocabulary(amenities, min_count)
+    assert vocabulary == df_predictions.columns.tolist()
+    assert np.array_equal(encode_amenities(amenities, vocabulary).toarray(), df_predictions.to_numpy())
+    assert np.array_equal(encode_raw_amenities(raw, vocabulary).toarray(), df_predictions.to_numpy())
+
+
+def test_amenity_listed_twice_is_one_feature():
+    matrix = encode_amenities([['TV', 'Wifi', 'TV'], ['Pool']], ['TV', 'Wifi'])
+    assert matrix.toarray().tolist() == [[1, 1], [0, 0]]
+    assert fit_vocabulary([['TV', 'TV'], ['Wifi']], 2) == []
+
+
+def test_raw_amenities_are_stripped_and_missing_ones_empty():
+    matrix = encode_raw_amenities(['TV, Wifi', None, '{"Cable TV"}'], ['Cable TV', 'TV', 'Wifi'])
+    assert matrix.toarray().tolist() == [[0, 1, 1], [0, 0, 0], [1, 0, 0]]
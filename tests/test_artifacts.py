@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from artifacts import load_artifact, save_chunks
+
+
+def test_listings_written_in_chunks_load_sorted_by_distance(tmp_path):
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'neighbourhood': rng.choice(['Harlem', 'Chelsea', 'SoHo', 'Astoria'], 100),
+                       'price': rng.randint(1, 10, 100) * 50.0,
+                       'distance': rng.randint(0, 20, 100) / 4}, index=pd.Index(rng.permutation(100) + 1000))
+    directory = str(tmp_path)
+    save_chunks((df.iloc[start:start + 30] for start in range(0, 100, 30)), 'df_listings', directory)
+
+    expected = df.sort_values('distance', kind='mergesort')
+    listings = load_artifact('df_listings', directory)
+    assert listings.index.tolist() == expected.index.tolist()
+    # the pages rely on the neighbourhoods in order of appearance, closest listings first
+    assert list(listings['neighbourhood'].cat.categories) == list(expected['neighbourhood'].unique())
+    np.testing.assert_array_equal(listings['price'], expected['price'])
+
+    # without the distance column the rows come in the same order
+    prices = load_artifact('df_listings', directory, columns=['neighbourhood', 'price'])
+    assert list(prices.columns) == ['neighbourhood', 'price']
+    assert prices.index.tolist() == expected.index.tolist()
+    assert list(prices['neighbourhood'].cat.categories) == list(expected['neighbourhood'].unique())
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from histograms import grouped_histograms, round_up
+
+METRICS = {'round_price': ('price', 100), 'round_rating': ('review_scores_rating', 5)}
+
+
+def listings(rng, rows):
+    """
+    Frame with a few neighbourhoods, some of them with a single listing, and missing values in every metric
+    """
+    df = pd.DataFrame({
+        'id_listings': np.arange(rows),
+        'neighbourhood': rng.choice(['Harlem', 'Chelsea', 'SoHo', 'Astoria', 'Tribeca'], rows,
+                                    p=[0.4, 0.3, 0.2, 0.08, 0.02]),
+        'price': rng.randint(1, 1000, rows).astype(float),
+        'review_scores_rating': rng.randint(20, 101, rows).astype(float),
+    })
+    for column in ['price', 'review_scores_rating']:
+        df.loc[rng.rand(rows) < 0.1, column] = np.nan
+    return df
+
+
+def expected(df, label, column, width):
+    """
+    The per-neighbourhood loop grouped_histograms replaced, with the bins of every neighbourhood
+    kept instead of only those of the first one
+    """
+    df = df.assign(**{label: round_up(df[column], width)})
+    shares = {}
+    for neigh in df.neighbourhood.unique():
+        per_neigh = df[df['neighbourhood'] == neigh].groupby(label).count()['id_listings']
+        total_listings = df[df['neighbourhood'] == neigh].count()['id_listings']
+        shares[neigh] = per_neigh / total_listings
+    wide = pd.concat(shares, axis=1).sort_index().reset_index()
+    wide[label] = wide[label].astype(int).astype(str)
+    return wide
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_grouped_histograms_match_per_neighbourhood_loop(seed):
+    rng = np.random.RandomState(seed)
+    df = listings(rng, rng.randint(1, 300))
+    histograms = grouped_histograms(df, METRICS)
+
+    for label, (column, width) in METRICS.items():
+        pd.testing.assert_frame_equal(histograms[label], expected(df, label, column, width), check_dtype=False)
+
+
+def test_grouped_histograms_keep_bins_of_every_neighbourhood():
+    df = pd.DataFrame({'id_listings': range(4), 'neighbourhood': ['Harlem', 'Harlem', 'SoHo', 'SoHo'],
+                       'price': [50.0, 150.0, 450.0, 150.0]})
+    wide = grouped_histograms(df, {'round_price': ('price', 100)})['round_price']
+
+    assert wide['round_price'].tolist() == ['100', '200', '500']
+    assert wide['Harlem'].tolist()[:2] == [0.5, 0.5] and np.isnan(wide['Harlem'][2])
+    assert np.isnan(wide['SoHo'][0]) and wide['SoHo'].tolist()[1:] == [0.5, 0.5]
+
+
+def test_grouped_histograms_count_without_normalize():
+    df = listings(np.random.RandomState(0), 200)
+    counts = grouped_histograms(df, METRICS, normalize=False)['round_price']
+    sizes = df['neighbourhood'].value_counts()
+    shares = expected(df, 'round_price', 'price', 100)
+
+    for neigh in df.neighbourhood.unique():
+        np.testing.assert_allclose(counts[neigh], shares[neigh] * sizes[neigh])
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from model import listing_diff, refresh_price_model, refreshable, row_hashes, train_price_model
+
+PARAMS = {'max_depth': 4, 'min_samples_leaf': 0.1, 'min_samples_split': 0.1, 'n_estimators': 20}
+
+
+def snapshot(rng, ids):
+    """
+    Features and prices of the listings with the given ids
+    """
+    X = pd.DataFrame({'TV': rng.randint(0, 2, len(ids)), 'Wifi': rng.randint(0, 2, len(ids)),
+                      'distance': rng.rand(len(ids)) * 10}, index=pd.Index(ids, name='id_listings'))
+    y = pd.Series(50 + 100 * X['TV'] + 20 * X['distance'] + rng.rand(len(ids)), index=X.index)
+    return X, y
+
+
+def next_snapshot(X, y):
+    """
+    The snapshot with listings 0-9 removed, the prices of listings 10-14 and the features of listings
+    15-19 changed and listings 1000-1019 added
+    """
+    rng = np.random.RandomState(1)
+    X, y = X.drop(range(10)), y.drop(range(10))
+    y = y.copy()
+    y.loc[10:14] += 25
+    X = X.copy()
+    X.loc[15:19, 'TV'] = 1 - X.loc[15:19, 'TV']
+    added_X, added_y = snapshot(rng, range(1000, 1020))
+    return pd.concat([X, added_X]), pd.concat([y, added_y])
+
+
+def test_listing_diff_finds_added_removed_and_changed_listings():
+    X, y = snapshot(np.random.RandomState(0), range(200))
+    new_X, new_y = next_snapshot(X, y)
+    diff = listing_diff(row_hashes(X, y), row_hashes(new_X, new_y))
+
+    assert diff['added'].tolist() == list(range(1000, 1020))
+    assert diff['removed'].tolist() == list(range(10))
+    assert diff['changed'].tolist() == list(range(10, 20))
+    assert all(len(listings) == 0 for listings in listing_diff(row_hashes(X, y), row_hashes(X, y)).values())
+
+
+def test_refresh_replaces_trees_and_keeps_their_number():
+    X, y = snapshot(np.random.RandomState(0), range(200))
+    price_model = train_price_model(X, y, PARAMS)
+    new_X, new_y = next_snapshot(X, y)
+
+    refreshed = refresh_price_model(price_model, row_hashes(X, y), new_X, new_y, time_budget=60, min_trees=2)
+    assert len(refreshed['model'].estimators_) == PARAMS['n_estimators']
+    assert refreshed['refresh']['trees_replaced'] == refreshed['refresh']['trees_planned'] > 0
+    assert refreshed['generation'] == 1
+    # the oldest trees are retired, the others are kept as they were
+    kept = PARAMS['n_estimators'] - refreshed['refresh']['trees_replaced']
+    assert ([tree.random_state for tree in refreshed['model'].estimators_[:kept]] ==
+            [tree.random_state for tree in price_model['model'].estimators_[-kept:]])
+    assert len(price_model['model'].estimators_) == PARAMS['n_estimators']
+
+
+def test_refresh_without_changes_keeps_the_model():
+    X, y = snapshot(np.random.RandomState(0), range(200))
+    price_model = train_price_model(X, y, PARAMS)
+
+    refreshed = refresh_price_model(price_model, row_hashes(X, y), X, y)
+    assert refreshed['refresh']['trees_replaced'] == 0
+    np.testing.assert_array_equal(refreshed['model'].predict(X), price_model['model'].predict(X))
+
+
+def test_refreshable_rejects_new_features_and_hyperparameters():
+    X, y = snapshot(np.random.RandomState(0), range(200))
+    price_model = train_price_model(X, y, PARAMS)
+
+    assert refreshable(price_model, X[['distance', 'Wifi', 'TV']], PARAMS)
+    assert not refreshable(price_model, X.assign(Gym=0), PARAMS)
+    assert not refreshable(price_model, X.drop(columns='Wifi'), PARAMS)
+    assert not refreshable(price_model, X, dict(PARAMS, max_depth=6))
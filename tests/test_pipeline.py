@@ -0,0 +1,116 @@
+import pandas as pd
+import pytest
+import pipeline
+
+BIN = 10
+SHIFT = 0
+
+
+def rounded(values, width=BIN):
+    return values // width * width
+
+
+@pytest.fixture
+def build(tmp_path, monkeypatch):
+    """
+    Small build with the shape of save_csv: two sources, a stage reading both and stages below it.
+    Returns a function running it that gives the status of every stage by name.
+    """
+    monkeypatch.setattr(pipeline, 'STAGES', [])
+    # the helpers of these stages are followed like the ones of save_csv
+    monkeypatch.setattr(pipeline, 'is_project_code', lambda func: func.__module__ in ('pipeline', __name__))
+    monkeypatch.chdir(tmp_path)
+    pd.DataFrame({'price': [120, 75, 310]}).to_csv('raw.csv', index=False)
+    pd.DataFrame({'name': ['park', 'bridge']}).to_csv('attractions.csv', index=False)
+
+    @pipeline.stage('clean', sources={'raw_path': 'raw.csv'}, outputs=['clean'])
+    def clean(raw_path):
+        return pd.read_csv(raw_path)
+
+    @pipeline.stage('attractions', sources={'attractions_path': 'attractions.csv'}, outputs=['attractions'])
+    def attractions(attractions_path):
+        return pd.read_csv(attractions_path)
+
+    @pipeline.stage('listings', inputs=['clean', 'attractions'], outputs=['listings'])
+    def listings(clean, attractions):
+        return clean.assign(attractions=len(attractions))
+
+    @pipeline.stage('bins', inputs=['clean'], outputs=['bins'], params={'width': BIN})
+    def bins(clean, width):
+        return clean.assign(bin=rounded(clean['price'], width) + SHIFT)
+
+    @pipeline.stage('summary', inputs=['listings'], outputs=['summary'])
+    def summary(listings):
+        return listings.describe()
+
+    def run(**kwargs):
+        return {name: status for name, status, _ in pipeline.run(directory=str(tmp_path / 'artifacts'), **kwargs)}
+    return run
+
+
+def test_second_build_is_up_to_date(build):
+    assert set(build().values()) == {'ran'}
+    assert set(build().values()) == {'up to date'}
+
+
+def test_editing_a_source_reruns_only_the_stages_below_it(build):
+    build()
+    pd.DataFrame({'name': ['park', 'bridge', 'museum']}).to_csv('attractions.csv', index=False)
+    assert build() == {'clean': 'up to date', 'attractions': 'ran', 'listings': 'ran', 'bins': 'up to date',
+                       'summary': 'ran'}
+
+
+def test_only_leaves_the_other_stages_alone(build):
+    build()
+    pd.DataFrame({'price': [99]}).to_csv('raw.csv', index=False)
+    assert build(only=['clean']) == {'clean': 'ran', 'attractions': 'up to date', 'listings': 'stale, skipped',
+                                     'bins': 'stale, skipped', 'summary': 'up to date'}
+    assert build() == {'clean': 'up to date', 'attractions': 'up to date', 'listings': 'ran', 'bins': 'ran',
+                       'summary': 'ran'}
+
+
+def test_param_overrides_are_part_of_the_key(build):
+    build()
+    statuses = build(overrides={'width': 100})
+    assert statuses['bins'] == 'ran' and statuses['clean'] == 'up to date'
+
+
+def test_constants_and_defaults_the_code_reads_are_part_of_the_key(build, monkeypatch):
+    build()
+    monkeypatch.setitem(globals(), 'SHIFT', 5)
+    assert build()['bins'] == 'ran'
+    # through the helper the stage calls
+    monkeypatch.setattr(rounded, '__defaults__', (20,))
+    assert build()['bins'] == 'ran'
+    assert build()['bins'] == 'up to date'
+
+
+def test_execution_params_are_not_part_of_the_key(build):
+    build()
+    assert set(build(overrides={'chunksize': 1000}).values()) == {'up to date'}
+
+
+def test_a_stage_can_update_its_previous_outputs(build):
+    seen = []
+
+    @pipeline.stage('model', inputs=['bins'], outputs=['model'], params={'refresh_budget': None}, previous=True)
+    def model(bins, refresh_budget, previous):
+        seen.append(sorted(previous))
+        return bins.assign(refreshed=refresh_budget is not None)
+
+    build()
+    pd.DataFrame({'price': [99]}).to_csv('raw.csv', index=False)
+    # updated in place of a full rebuild, the manifest records it so a plain build has nothing left to do
+    assert build(overrides={'refresh_budget': 1.0})['model'] == 'ran'
+    assert seen == [[], ['model']]
+    assert build()['model'] == 'up to date'
+
+
+def test_notes_of_a_stage_are_part_of_its_status(build):
+    @pipeline.stage('model', inputs=['bins'], outputs=['model'])
+    def model(bins):
+        pipeline.note("trained from scratch")
+        return bins
+
+    assert build()['model'] == 'ran; trained from scratch'
+    assert build(force=True)['summary'] == 'ran'
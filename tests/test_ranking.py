@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ranking import Rankings
+
+COLUMNS = ['price', 'review_scores_rating', 'distance']
+
+
+def listings(rng, rows):
+    """
+    Frame with few distinct values, so that there are many ties, and missing values in every column
+    """
+    df = pd.DataFrame({
+        'neighbourhood': rng.choice(['Harlem', 'Chelsea', 'SoHo', 'Astoria'], rows),
+        'price': rng.randint(1, 6, rows) * 50.0,
+        'review_scores_rating': rng.randint(16, 21, rows) * 5.0,
+        'distance': rng.randint(0, 4, rows) / 2,
+    })
+    for column in COLUMNS:
+        df.loc[rng.rand(rows) < 0.1, column] = np.nan
+    return df
+
+
+def expected(df, columns, ascending, n):
+    return df.sort_values(columns, ascending=[ascending[c] for c in columns], kind='mergesort',
+                          na_position='last').index[:n].to_numpy()
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_top_n_matches_sort_values(seed):
+    rng = np.random.RandomState(seed)
+    df = listings(rng, rng.randint(1, 400))
+    ascending = {column: bool(rng.rand() < 0.5) for column in COLUMNS}
+    columns = list(rng.permutation(COLUMNS)[:rng.randint(1, 4)])
+    n = rng.randint(0, len(df) + 5)
+    rankings = Rankings(df, ascending)
+
+    # overall
+    assert np.array_equal(rankings.top_n(columns, n), expected(df, columns, ascending, n))
+
+    # one neighbourhood
+    group = df['neighbourhood'].iloc[0]
+    assert np.array_equal(rankings.top_n(columns, n, group=group),
+                          expected(df[df['neighbourhood'] == group], columns, ascending, n))
+
+    # a subset of the rows, small ones are sorted directly and large ones picked from the overall order
+    for size in [max(len(df) // 20, 1), len(df) // 2]:
+        positions = rng.choice(len(df), size, replace=False)
+        assert np.array_equal(rankings.top_n(columns, n, positions=positions),
+                              expected(df.iloc[np.sort(positions)], columns, ascending, n))
+
+
+def test_top_n_of_unknown_group_is_empty():
+    df = listings(np.random.RandomState(0), 50)
+    rankings = Rankings(df, {'price': True})
+    assert len(rankings.top_n(['price'], 5, group='Nowhere')) == 0
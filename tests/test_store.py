@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from histograms import round_up
+from store import ListingStore
+
+NEIGHBOURHOODS = ['Harlem', 'Chelsea', 'SoHo', 'Astoria']
+
+
+def listings(rng, rows):
+    """
+    Frame with many listings per price bin and some missing prices and ratings
+    """
+    df = pd.DataFrame({
+        'neighbourhood': rng.choice(NEIGHBOURHOODS, rows),
+        'price': rng.randint(1, 40, rows) * 25.0,
+        'review_scores_rating': rng.randint(20, 101, rows).astype(float),
+    })
+    for column in ['price', 'review_scores_rating']:
+        df.loc[rng.rand(rows) < 0.1, column] = np.nan
+    return df
+
+
+def selected(df, neighbourhood, minimum, maximum, price_bin):
+    """
+    Rows of the analysis page's former filter of the listings frame, ordered by price bin and indexed
+    by row position
+    """
+    df = df.reset_index(drop=True).assign(round_price=round_up(df['price'], price_bin))
+    df = df.loc[(df['neighbourhood'] == neighbourhood) & (df['round_price'] >= minimum) &
+                (df['round_price'] <= maximum)]
+    return df.sort_values('round_price', kind='mergesort')
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_select_and_histogram_match_loc_filter(seed):
+    rng = np.random.RandomState(seed)
+    df = listings(rng, rng.randint(1, 400))
+    price_bin = int(rng.choice([25, 50, 100]))
+    store = ListingStore(df, price_bin=price_bin)
+
+    for neighbourhood in NEIGHBOURHOODS + ['Nowhere']:
+        minimum, maximum = np.sort(rng.randint(0, 1100, 2))
+        for low, high in [(minimum, maximum), (-np.inf, np.inf)]:
+            rows = selected(df, neighbourhood, low, high, price_bin)
+            assert np.array_equal(store.select(neighbourhood, low, high), rows.index)
+
+            for column, width in [('price', price_bin), ('price', 200), ('review_scores_rating', 5)]:
+                counts = rows.groupby(round_up(rows[column], width)).size()
+                edges, heights = store.histogram(neighbourhood, low, high, column, width)
+                assert np.array_equal(edges, counts.index.to_numpy(dtype=float))
+                assert np.array_equal(heights, counts.to_numpy())
+
+
+def test_frame_copies_the_selected_rows():
+    df = listings(np.random.RandomState(0), 100)
+    store = ListingStore(df)
+    positions = store.select('Harlem', 100, 500)
+
+    frame = store.frame(positions, ['price', 'review_scores_rating'])
+    pd.testing.assert_frame_equal(frame, df.iloc[positions][['price', 'review_scores_rating']].reset_index(drop=True))
+    frame.loc[:, 'price'] = 0.0
+    assert not (store.columns['price'][positions] == 0).any()
+    with pytest.raises(ValueError):
+        store.columns['price'][0] = 0.0